@@ -1,9 +1,11 @@
 import streamlit as st
 import json
-import openai
-openai.api_key = st.secrets["openai"]["api_key"]
 import random
 
+from llm_cache import cache_key
+from llm_client import LLMClient, LLMError, stream_to_placeholder
+from llm_jobs import JobQueue, QueueFullError
+
 
 # حقن CSS للتنسيق (من اليمين لليسار، وألوان وتصميم متناسق)
 st.markdown(
@@ -155,10 +157,18 @@ def load_questions(json_file):
         data = json.load(f)
     return data["questions"]
 
-# التحليل عبر OpenAI API
-import openai
+# التحليل عبر OpenAI API (عميل مشترك يبث الرد ويسجل زمن أول رمز والزمن الكلي)
+@st.cache_resource
+def get_llm_client():
+    return LLMClient.from_secrets(st.secrets["openai"])
+
+# طابور توليد التقارير في الخلفية مشترك بين الجلسات: عدد محدود من الطلبات المتزامنة للنموذج،
+# وصفحة الطالب تعرض ترتيبه في الانتظار ثم التحليل أثناء توليده بدلاً من حجز خيط الخادم طوال التوليد
+@st.cache_resource
+def get_job_queue():
+    return JobQueue()
 
-def get_analysis_online(mistake_responses):
+def analysis_messages(mistake_responses):
     prompt = "حلل الردود التالية التي تمت الإجابة عليها بشكل خاطئ لتحديد نقاط الضعف حاول يكون التحليل مختصر ومركز ويتم تعريف الطالب بالضعف في اي مجال (الرياضيات، الاحياء، الكيمياء، الفيزياء)  بدون تحليل كل سؤال على حده، وانصح الطالب الالتحاق بالدوات في اكاديمية طريق العلم.\n"
     for item in mistake_responses:
         prompt += (
@@ -166,22 +176,39 @@ def get_analysis_online(mistake_responses):
             f"الإجابة المختارة: {item['selected_answer']}\n"
             f"الإجابة الصحيحة: {item.get('correct_answer', 'غير محددة')}\n"
         )
-    try:
-        response = openai.ChatCompletion.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "أنت مساعد مفيد."},
-                {"role": "user", "content": prompt},
-            ],
-            temperature=0.7,
-            max_tokens=1000,
-        )
-        return response.choices[0].message['content'].strip()
-    except Exception as e:
-        return f"حدث خطأ في الاتصال بواجهة OpenAI: {e}"
+    return [
+        {"role": "system", "content": "أنت مساعد مفيد."},
+        {"role": "user", "content": prompt},
+    ]
+
+def submit_analysis(mistake_responses):
+    """
+    يضيف طلب التحليل إلى الطابور ويعيد رقم الطلب (QueueFullError إذا امتلأ الطابور).
+    الطلبات المتطابقة (نفس الأخطاء، أو الضغط على الزر مرتين) تشترك في توليد واحد.
+    """
+    llm_client = get_llm_client()
+    messages = analysis_messages(mistake_responses)
+    params = dict(temperature=0.7, max_tokens=1000)
+    return get_job_queue().submit(
+        lambda: llm_client.stream(messages, **params),
+        key=cache_key(model=llm_client.model, messages=messages, **params),
+    )
 
-def get_analysis(mistake_responses):
-    return get_analysis_online(mistake_responses)
+def show_analysis(job_id, placeholder):
+    """
+    يعرض ترتيب الطلب في الانتظار، ثم يبث نص التحليل في placeholder أثناء توليده حتى ينتهي
+    (الطابور للتحكم في عدد الطلبات المتزامنة فقط؛ لا تُعاد الصفحة لمتابعة الطلب).
+    """
+    job_queue = get_job_queue()
+    if job_queue.get(job_id) is None:
+        placeholder.warning("انتهت صلاحية طلب التحليل، يرجى طلب التقرير مرة أخرى.")
+        return
+    for position in job_queue.positions(job_id):
+        placeholder.info(f"طلبك في قائمة الانتظار، ترتيبك: {position}. سيبدأ التحليل تلقائياً.")
+    try:
+        stream_to_placeholder(job_queue.follow(job_id), placeholder)
+    except LLMError as e:
+        placeholder.write(f"حدث خطأ في الاتصال بواجهة OpenAI: {e}")
 
 # تهيئة متغيرات الحالة
 if "intro_shown" not in st.session_state:
@@ -198,6 +225,8 @@ if "selected_answer" not in st.session_state:
     st.session_state.selected_answer = None
 if "report_shown" not in st.session_state:
     st.session_state.report_shown = False
+if "report_job" not in st.session_state:
+    st.session_state.report_job = None
 
 # ترويسة التطبيق
 st.markdown(
@@ -292,10 +321,16 @@ else:
                                 "correct_answer": correct_ans
                             })
                 
-                analysis = get_analysis(mistakes)
+                try:
+                    st.session_state.report_job = submit_analysis(mistakes)
+                except QueueFullError as e:
+                    st.warning(f"الخادم مشغول حالياً ({e.pending} طلب في الانتظار)، يرجى المحاولة بعد قليل.")
+            
+            # يُبث التحليل في الصفحة أثناء توليده، ويُعرض كاملاً مباشرة عند إعادة تشغيل الصفحة بعد انتهائه
+            if st.session_state.report_job:
                 st.markdown("<div class='report-container'>", unsafe_allow_html=True)
                 st.header("التحليل والتوصيات (للأسئلة الخاطئة)")
-                st.write(analysis)
+                show_analysis(st.session_state.report_job, st.empty())
                 st.markdown("</div>", unsafe_allow_html=True)
                 st.session_state.report_shown = True
             
@@ -1,19 +1,20 @@
 import streamlit as st
 import json
 import random
-from transformers import pipeline
+
+from llm_client import DEFAULT_METRICS_PATH, LLMClient, TransformersBackend, stream_to_placeholder
 
 # Use offline mode with GPT-J
 USE_OFFLINE_MODEL = True
 GPTJ_MODEL_NAME = "EleutherAI/gpt-j-6B"
 
 @st.cache_resource
-def load_gptj_model():
-    # Load the GPT-J model once. Adjust device if you have a GPU (device=0) otherwise use device=-1.
-    return pipeline("text-generation", model=GPTJ_MODEL_NAME, device=-1)
-
-if USE_OFFLINE_MODEL:
-    generator = load_gptj_model()
+def get_llm_client():
+    if not USE_OFFLINE_MODEL:
+        return LLMClient.from_secrets(st.secrets["openai"])
+    # The GPT-J model is loaded once, on the first analysis. Adjust device if you have a GPU (device=0) otherwise use device=-1.
+    # CPU generation is slow, so allow more time per answer than for the hosted API.
+    return LLMClient(TransformersBackend(GPTJ_MODEL_NAME, device=-1), max_duration=600, metrics_path=DEFAULT_METRICS_PATH)
 
 # Inject CSS for design (RTL, dark header, Sakkal Majalla font, etc.)
 st.markdown(
@@ -155,8 +156,8 @@ def load_questions(json_file):
         data = json.load(f)
     return data["questions"]
 
-# Offline analysis function using GPT-J
-def get_analysis_offline(mistake_responses):
+# Offline analysis function using GPT-J (streamed into the placeholder as it is generated)
+def get_analysis_offline(mistake_responses, placeholder):
     refined_prompt = (
      "حلل الردود التالية التي تمت الإجابة عليها بشكل خاطئ لتحديد نقاط الضعف حاول يكون التحليل مختصر ومركز ويتم تعريف الطالب بالضعف في اي مجال (الرياضيات، الاحياء، الكيمياء، الفيزياء)  بدون تحليل كل سؤال على حده، وانصح الطالب الالتحاق بالدوات في اكاديمية طريق العلم.\n"
     )
@@ -166,14 +167,16 @@ def get_analysis_offline(mistake_responses):
             f"الإجابة المختارة: {item['selected_answer']}\n"
             f"الإجابة الصحيحة: {item.get('correct_answer', 'غير محددة')}\n"
         )
-    generated = generator(refined_prompt, max_length=500, do_sample=True, temperature=0.7)
-    analysis_text = generated[0]['generated_text']
-    if refined_prompt in analysis_text:
-        analysis_text = analysis_text.split(refined_prompt, 1)[-1]
-    return analysis_text.strip()
+    try:
+        chunks = get_llm_client().stream([{"role": "user", "content": refined_prompt}], temperature=0.7, max_tokens=500)
+        return stream_to_placeholder(chunks, placeholder)
+    except Exception as e:
+        error = f"حدث خطأ أثناء توليد التحليل: {e}"
+        placeholder.write(error)
+        return error
 
-def get_analysis(mistake_responses):
-    return get_analysis_offline(mistake_responses)
+def get_analysis(mistake_responses, placeholder):
+    return get_analysis_offline(mistake_responses, placeholder)
 
 # Initialize session state variables
 if "intro_shown" not in st.session_state:
@@ -284,10 +287,9 @@ else:
                                 "selected_answer": user_ans,
                                 "correct_answer": correct_ans
                             })
-                analysis = get_analysis(mistakes)
                 st.markdown("<div class='report-container'>", unsafe_allow_html=True)
                 st.header("التحليل والتوصيات (للأسئلة الخاطئة)")
-                st.write(analysis)
+                analysis = get_analysis(mistakes, st.empty())
                 st.markdown("</div>", unsafe_allow_html=True)
                 st.session_state.report_shown = True
             
@@ -1,19 +1,23 @@
 import streamlit as st
-import pandas as pd
-import random
 import matplotlib.pyplot as plt
-import openai
+
+from compact_session import CompactSession
+from llm_cache import ResponseCache, cache_key, normalize
+from llm_client import LLMClient, LLMError, stream_to_placeholder
+from llm_jobs import JobQueue, QueueFullError
+from question_bank import load_bank, new_session_seed, session_rng
+from riasec_scoring import RiasecScorer
+from usoc_index import MAJORS_SEPARATOR, USOCIndex, load_usoc_table
 # from utils import OPENAI_API_KEY
 # openai.api_key = OPENAI_API_KEY
 # Configure Matplotlib for Right-to-Left text support
 plt.rcParams['font.family'] = 'Arial'
 plt.rcParams['axes.unicode_minus'] = False
-openai.api_key = st.secrets["openai"]["api_key"]
 
-# Load Data
-questions_df = pd.read_csv("questions_dict.csv")
-activities_df = pd.read_csv("activities.csv")
-subjects_df = pd.read_csv("subject_category_mapping.csv")
+# Load Data (مرة واحدة لكل عملية ومشتركة بين الجلسات، ويُعاد التحميل فقط عند تعديل الملفات)
+questions_bank = load_bank("questions_dict.csv", "Question")
+activities_bank = load_bank("activities.csv", "Activity")
+subjects_bank = load_bank("subject_category_mapping.csv", "Subject")
 
 
 USOC_file = 'USOC.xlsx'  # ضع مسار الملف هنا
@@ -22,10 +26,41 @@ USOC_file = 'USOC.xlsx'  # ضع مسار الملف هنا
 def load_data(USOC_file):
     # تحميل البيانات عند رفع الملف
     if USOC_file is not None:
-        df = pd.read_excel(USOC_file)
+        # تُقرأ النسخة العمودية المخزنة على القرص، ولا يُقرأ ملف Excel إلا عند تغير بصمته
+        df = load_usoc_table(USOC_file)
         return df
     return None
 
+# فهرس المهن حسب الكود يُبنى مرة واحدة لكل عملية ويُشارك بين جميع الجلسات
+@st.cache_resource
+def load_usoc_index(USOC_file):
+    df = load_data(USOC_file)
+    if df is None:
+        return None
+    return USOCIndex(df)
+
+# عميل النموذج اللغوي (بث الرد مع قياس زمن أول رمز والزمن الكلي) مشترك بين الجلسات
+@st.cache_resource
+def get_llm_client():
+    return LLMClient.from_secrets(st.secrets["openai"])
+
+# ذاكرة مؤقتة على القرص لردود الإرشاد الذكي مشتركة بين الجلسات (الطلاب بنفس المدخلات يحصلون على نفس الرد)
+@st.cache_resource
+def get_guidance_cache():
+    return ResponseCache("llm_cache.db")
+
+# طابور توليد الإرشاد في الخلفية مشترك بين الجلسات: عدد محدود من الطلبات المتزامنة للنموذج،
+# وصفحة الطالب تعرض ترتيبه في الانتظار ثم الرد أثناء توليده بدلاً من حجز خيط الخادم طوال التوليد
+@st.cache_resource
+def get_job_queue():
+    return JobQueue()
+
+# مصفوفة أوزان التسجيل تُبنى مرة واحدة لكل نسخة من البنوك (تتغير فقط عند تعديل ملفاتها)
+@st.cache_resource
+def load_scorer(bank_mtimes, _questions_bank, _activities_bank, _subjects_bank):
+    subject_categories = [_subjects_bank.text_categories(subject) for subject, _ in _subjects_bank.unique_texts]
+    return RiasecScorer.from_banks(range(len(RESPONSE_OPTIONS)), _questions_bank, _activities_bank, subject_categories)
+
 
 # English mapping for categories
 category_english_mapping = {
@@ -42,28 +77,35 @@ st.set_page_config(page_title="اختبار الشخصية", layout="wide", init
 st.title("اختبار تحديد الشخصية")
 st.markdown("<style>body { direction: rtl; text-align: right; }</style>", unsafe_allow_html=True)
 
+# رقم الخيار هو نفسه نقاط الإجابة (من 0 لـ "لا أوافق بشدة" إلى 4 لـ "أوافق بشدة")
+RESPONSE_OPTIONS = ["لا أوافق بشدة", "لا أوافق", "غير متأكد", "أوافق", "أوافق بشدة"]
+AGREE_RESPONSE = RESPONSE_OPTIONS.index("أوافق")
+scorer = load_scorer(
+    (questions_bank.mtime, activities_bank.mtime, subjects_bank.mtime), questions_bank, activities_bank, subjects_bank
+)
+
 # Initialize session state
-if "scores" not in st.session_state:
-    st.session_state.scores = {"واقعي": 0, "تحليلي": 0, "فني": 0, "اجتماعي": 0, "ريادي": 0, "تقليدي": 0}
+# الأسئلة والإجابات والأنشطة والمواد والنقاط محفوظة في survey (CompactSession) كأرقام صفوف ومصفوفات صغيرة
 if "step" not in st.session_state:
     st.session_state.step = 1
 if "question_index" not in st.session_state:
     st.session_state.question_index = 0
-if "questions" not in st.session_state:
-    st.session_state.questions = None
-if "selected_activities" not in st.session_state:
-    st.session_state.selected_activities = []
-if "selected_subjects" not in st.session_state:
-    st.session_state.selected_subjects = []
-if "sampled_activities" not in st.session_state:
-    st.session_state.sampled_activities = None
+if "survey" not in st.session_state:
+    st.session_state.survey = None
+if "guidance_key" not in st.session_state:
+    # مفتاح الرد في ذاكرة الإرشاد ورقم طلب توليده في الطابور (إن لم يكن مخزناً)
+    st.session_state.guidance_key = None
+    st.session_state.guidance_job = None
+if "sample_seed" not in st.session_state:
+    # يمكن إعادة إنتاج عينة أسئلة وأنشطة طالب معين بفتح التطبيق مع ?seed=<الرقم> للمراجعة
+    seed_param = st.experimental_get_query_params().get("seed", [None])[0]
+    st.session_state.sample_seed = int(seed_param) if seed_param and seed_param.isdigit() else new_session_seed()
 
 
 # دالة لعرض البيانات بناءً على CODE
-def display_job_details(code, df):
-    # تصفية البيانات حسب CODE
-    sorted_code = "".join(sorted(code))  # ترتيب الحروف في الكود
-    filtered_df = df[df['CODE'].apply(lambda x: "".join(sorted(str(x))) == sorted_code)]
+def display_job_details(code, usoc_index):
+    # استرجاع المهن المرتبطة بالكود مباشرة من الفهرس (بغض النظر عن ترتيب الحروف)
+    filtered_df = usoc_index.lookup(code)
     
     if filtered_df.empty:
         st.write("لا توجد مهن مرتبطة بهذا الكود.")
@@ -73,20 +115,13 @@ def display_job_details(code, df):
     st.write(f"البيانات للمهن المرتبطة بالكود: {code}")
     st.dataframe(filtered_df)
 
-    # استخراج التخصصات المقترحة للطالب
+    # التخصصات المقترحة للطالب محسوبة مسبقاً في الفهرس من الأعمدة "المجال التعليمي 1", "المجال التعليمي 2", "المجال التعليمي 3"
     st.write("### التخصصات المقترحة للطالب:")
-    all_fields = set()  # استخدام set لإزالة التكرار
-    
-    # استخراج القيم من الأعمدة "المجال التعليمي 1", "المجال التعليمي 2", "المجال التعليمي 3"
-    for idx, row in filtered_df.iterrows():
-        for i in range(1, 4):
-            field = row.get(f"المجال التعليمي {i}")
-            if pd.notna(field):
-                all_fields.add(field)  # إضافة التخصص إلى set (يتم إزالة التكرار تلقائيًا)
+    all_fields = usoc_index.suggested_fields(code)
     
     # دمج التخصصات في نص واحد
     if all_fields:
-        fields_text = ", ".join(sorted(all_fields))  # دمج التخصصات في نص واحد مفصول بفواصل
+        fields_text = MAJORS_SEPARATOR.join(all_fields)  # دمج التخصصات في نص واحد مفصول بفواصل
         st.write(f"التخصصات المقترحة: {fields_text}")
     else:
         st.write("لا توجد تخصصات مقترحة.")
@@ -94,48 +129,61 @@ def display_job_details(code, df):
     return fields_text
 
 # Helper Functions
-def get_random_questions(df, n=10):
-    return df.groupby("Category").apply(lambda x: x.sample(n=min(n, len(x)))).reset_index(drop=True)
-
-def update_scores_from_response(category, response):
-    if response == "أوافق بشدة":
-        st.session_state.scores[category] += 4
-    elif response == "أوافق":
-        st.session_state.scores[category] += 3
-    elif response == "غير متأكد":
-        st.session_state.scores[category] += 2
-    elif response == "لا أوافق":
-        st.session_state.scores[category] += 1
-
-def get_activities_sample(df, n_per_category=2):
-    return df.groupby("Category").apply(lambda x: x.sample(n=min(n_per_category, len(x)))).reset_index(drop=True)
+# تعيد العينات أرقام صفوف في البنوك المشتركة فقط (وليس نسخاً من الجداول) لتخزينها في session_state
+def get_random_questions(bank, n=10):
+    return bank.sample_rows(n, session_rng(st.session_state.sample_seed, 0))
+
+def save_response(survey, index, response):
+    scorer.record_response(survey, index, RESPONSE_OPTIONS.index(response))
+
+def get_activities_sample(bank, n_per_category=2):
+    return bank.sample_rows(n_per_category, session_rng(st.session_state.sample_seed, 1))
+
+def show_guidance(placeholder):
+    """يعرض الإرشاد المخزن، أو ترتيب الطلب في الانتظار ثم نص الإرشاد أثناء توليده حتى ينتهي."""
+    answer = get_guidance_cache().get(st.session_state.guidance_key)
+    if answer is not None:
+        placeholder.info(answer)
+        return
+    job_queue = get_job_queue()
+    job_id = st.session_state.guidance_job
+    if job_queue.get(job_id) is None:
+        placeholder.warning("انتهت صلاحية طلب الإرشاد، يرجى طلبه مرة أخرى.")
+        return
+    for position in job_queue.positions(job_id):
+        placeholder.info(f"طلبك في قائمة الانتظار، ترتيبك: {position}. سيظهر الإرشاد تلقائياً.")
+    try:
+        stream_to_placeholder(job_queue.follow(job_id), placeholder, render="info")
+    except LLMError as e:
+        placeholder.error(f"تعذر الحصول على الإرشاد الذكي حالياً، يرجى المحاولة لاحقاً: {e}")
 
 # Step 1: Questions
 if st.session_state.step == 1:
     st.header("الجزء الأول: الأسئلة")
 
-    if st.session_state.questions is None:
-        st.session_state.questions = get_random_questions(questions_df, 10)
+    if st.session_state.survey is None:
+        st.session_state.survey = CompactSession(
+            get_random_questions(questions_bank, 10), n_subjects=len(subjects_bank.unique_texts)
+        )
 
-    questions = st.session_state.questions
+    survey = st.session_state.survey
+    questions = survey.question_rows
     total_questions = len(questions)
     current_index = st.session_state.question_index
 
     if current_index < total_questions:
-        current_q = questions.iloc[current_index]
+        question_row = questions[current_index]
+        current_q = {"Question": questions_bank.texts[question_row], "Category": questions_bank.categories[question_row]}
         st.markdown(f"""
         <div style="background-color:#f9f9f9; padding:20px; border-radius:10px; margin-bottom:20px;">
             <h3 style="text-align:center; font-size:20px; color:#555;">السؤال {current_index + 1} من {total_questions}</h3>
             <h2 style="text-align:center; font-size:24px; color:#333;">{current_q["Question"]}</h2>
         </div>
         """, unsafe_allow_html=True)
-        temp_response = st.radio("اختر إجابتك:", [
-            "لا أوافق بشدة", "لا أوافق", "غير متأكد", "أوافق", "أوافق بشدة"
-        ], key=f"temp_response_{current_index}", index=0)
+        temp_response = st.radio("اختر إجابتك:", RESPONSE_OPTIONS, key=f"temp_response_{current_index}", index=0)
 
         if st.button("التالي", key=f"next_{current_index}"):
-            st.session_state[f"response_{current_index}"] = temp_response  # حفظ الإجابة
-            update_scores_from_response(current_q["Category"], temp_response)
+            save_response(survey, current_index, temp_response)  # حفظ الإجابة
             st.session_state.question_index += 1
             st.experimental_rerun()
     else:
@@ -146,22 +194,18 @@ if st.session_state.step == 2:
     st.header("الجزء الثاني: الأنشطة")
     st.write("يرجى اختيار الأنشطة التي تفضلها من الخيارات التالية:")
 
-    if st.session_state.sampled_activities is None:
-        st.session_state.sampled_activities = get_activities_sample(activities_df, n_per_category=2)
-
-    sampled_activities = st.session_state.sampled_activities
+    survey = st.session_state.survey
+    if len(survey.activity_rows) == 0:
+        survey.set_activities(get_activities_sample(activities_bank, n_per_category=2))
 
     cols = st.columns(3)
-    for i, (_, row) in enumerate(sampled_activities.iterrows()):
+    for i, activity_row in enumerate(survey.activity_rows):
+        activity = activities_bank.texts[activity_row]
         with cols[i % 3]:
-            if st.checkbox(row["Activity"], key=f"activity_{i}"):
-                if row["Activity"] not in st.session_state.selected_activities:
-                    st.session_state.selected_activities.append(row["Activity"])
-                    category = row["Category"]
-                    st.session_state.scores[category] += 1
+            scorer.record_activity(survey, i, st.checkbox(activity, key=f"activity_{i}"))
 
     if st.button("التالي"):
-        if st.session_state.selected_activities:
+        if survey.activity_selected.any():
             st.session_state.step = 3
             st.experimental_rerun()
         else:
@@ -173,26 +217,19 @@ if st.session_state.step == 3:
     st.header("الجزء الثالث: المواد الدراسية")
     st.write("يرجى اختيار المواد التي تفضلها:")
 
-    # Remove duplicates from the subjects to show only unique ones
-    unique_subjects_df = subjects_df.drop_duplicates(subset="Subject")
+    # Unique subjects (with the row of their first occurrence) are precomputed in the shared bank
+    unique_subjects = subjects_bank.unique_texts
 
     selected_subject_checkboxes = []
-    for _, row in unique_subjects_df.iterrows():
+    for subject, first_row in unique_subjects:
         selected_subject_checkboxes.append(
-            st.checkbox(row["Subject"], key=f"subject_{row.name}")
+            st.checkbox(subject, key=f"subject_{first_row}")
         )
 
     if st.button("عرض النتيجة"):
+        survey = st.session_state.survey
         for idx, selected in enumerate(selected_subject_checkboxes):
-            if selected:
-                subject = unique_subjects_df.iloc[idx]["Subject"]
-                if subject not in st.session_state.selected_subjects:
-                    st.session_state.selected_subjects.append(subject)
-                    
-                    # Get the categories associated with the subject
-                    categories = subjects_df[subjects_df["Subject"] == subject]["Category"]
-                    for category in categories:
-                        st.session_state.scores[category] += 1  # Update the score for the category
+            scorer.record_subject(survey, idx, selected)  # تُحتسب لكل فئة مرتبطة بالمادة
 
         st.session_state.step = 4
         st.experimental_rerun()
@@ -201,9 +238,12 @@ if st.session_state.step == 3:
 if st.session_state.step == 4:
     st.header("النتيجة النهائية")
 
+    survey = st.session_state.survey
+    scores = scorer.score_dict(survey)
+
     # Calculate percentages
-    total_score = sum(st.session_state.scores.values())
-    percentages = {category: (score / total_score) * 100 for category, score in st.session_state.scores.items()}
+    total_score = sum(scores.values())
+    percentages = {category: (score / total_score) * 100 for category, score in scores.items()}
 
     # Map categories to English
     percentages_english = {category_english_mapping[cat]: val for cat, val in percentages.items()}
@@ -223,13 +263,14 @@ if st.session_state.step == 4:
     st.pyplot(fig)
 
     # Display personality code
-    sorted_scores = sorted(st.session_state.scores.items(), key=lambda x: x[1], reverse=True)
+    sorted_scores = sorted(scores.items(), key=lambda x: x[1], reverse=True)
     top_two = sorted_scores[:2]
     code = f"{category_english_mapping[top_two[0][0]][0]}{category_english_mapping[top_two[1][0]][0]}"
     st.subheader(f"Personality Code: {code}")
-    df_USOC = load_data(USOC_file)
+    st.caption(f"رقم العينة: {st.session_state.sample_seed}")
+    usoc_index = load_usoc_index(USOC_file)
 
-    st.session_state.selected_majors =display_job_details(code,df_USOC)
+    st.session_state.selected_majors =display_job_details(code,usoc_index)
 
     
 
@@ -259,14 +300,20 @@ if st.session_state.step == 4:
     # Academic and Career Guidance
     if st.button("عرض الإرشاد الذكي"):
         personality_code = code
-        selected_questions = [
-            row["Question"]
-            for idx, row in st.session_state.questions.iterrows()
-            if st.session_state.get(f"response_{idx}") in ["أوافق", "أوافق بشدة"]
-        ]
-        selected_activities = st.session_state.selected_activities
-        selected_subjects   = st.session_state.selected_subjects
-        selected_majors     = st.session_state.selected_majors
+        # المدخلات بصيغة موحدة (قوائم مرتبة ومسافات موحدة) حتى يتطابق الرد المخزن لنفس الاختيارات بأي ترتيب
+        guidance_inputs = normalize({
+            "questions": [
+                questions_bank.texts[question_row]
+                for question_row in survey.question_rows[survey.responses >= AGREE_RESPONSE]
+            ],
+            "activities": [activities_bank.texts[row] for row in survey.selected_activity_rows()],
+            "subjects": [subjects_bank.unique_texts[idx][0] for idx in survey.subject_selected.nonzero()[0]],
+            "majors": [major for major in (st.session_state.selected_majors or "").split(MAJORS_SEPARATOR) if major],
+        })
+        selected_questions  = guidance_inputs["questions"]
+        selected_activities = guidance_inputs["activities"]
+        selected_subjects   = guidance_inputs["subjects"]
+        selected_majors     = guidance_inputs["majors"]
         
 
         # Prompt for ChatGPT
@@ -293,18 +340,31 @@ if st.session_state.step == 4:
     
         """
 
-        response = openai.ChatCompletion.create(
-            model="gpt-4o-mini",  # Replace with the exact model name if different
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant."},
-                {"role": "user", "content": prompt},
-            ],
-            temperature=0.7,
-            max_tokens=500,
-        )
-        # Extract the answer from the response object
-        answer = response.choices[0].message['content'].strip()
-
-        st.info(answer)
+        llm_client = get_llm_client()
+        messages = [
+            {"role": "system", "content": "You are a helpful assistant."},
+            {"role": "user", "content": prompt},
+        ]
+        params = dict(temperature=0.7, max_tokens=500)
+
+        # المفتاح يشمل نص الطلب كاملاً والنموذج والإعدادات، فأي تغيير في القالب لا يعيد رداً قديماً
+        guidance_cache = get_guidance_cache()
+        key = cache_key(model=llm_client.model, messages=messages, **params)
+        if guidance_cache.get(key) is None:
+            # التوليد في الخلفية، والطلاب بنفس المفتاح أثناء التوليد ينتظرون نفس الطلب
+            try:
+                st.session_state.guidance_job = get_job_queue().submit(
+                    lambda: llm_client.stream(messages, **params),
+                    key=key,
+                    on_done=lambda answer: guidance_cache.put(key, answer),
+                )
+            except QueueFullError as e:
+                st.warning(f"الخادم مشغول حالياً ({e.pending} طلب في الانتظار)، يرجى المحاولة بعد قليل.")
+                key = None
+        st.session_state.guidance_key = key
+
+    # يُبث الإرشاد في الصفحة أثناء توليده
+    if st.session_state.guidance_key:
+        show_guidance(st.empty())
 
         
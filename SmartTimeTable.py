@@ -1,6 +1,10 @@
 import streamlit as st
+import io
+
 import pandas as pd
 
+from timetable_engine import CourseCatalog, IncrementalScheduler, clean_student_plan, content_hash, schedule_optimal
+
 st.title("توليد الجدول الدراسي لطلاب برنامج نظم المعلومات الصحية")
 
 st.markdown("""
@@ -16,27 +20,35 @@ courses_file = st.file_uploader("اختر ملف Excel الخاص بالمقرر
 st.header("رفع ملف الخطة الدراسية للطلاب")
 students_file = st.file_uploader("اختر ملف Excel الخاص بالخطة الدراسية", type=["xlsx"], key="students")
 
+# دالة لتجهيز كتالوج المقررات مرة واحدة لكل ملف مع التخزين المؤقت (المفتاح هو بصمة محتوى الملف)
+@st.cache_resource
+def load_course_catalog(courses_hash, _courses_bytes):
+    return CourseCatalog.from_excel_bytes(_courses_bytes)
+
+# نتيجة آخر تشغيل في هذه الجلسة لـ (ملف مقررات، حد أقصى للساعات)، حتى يُعاد حساب الطلاب المتغيرين فقط عند إعادة رفع الخطة
+# (محفوظة في حالة الجلسة وليست مشتركة، حتى لا تُقارن خطة مستخدم بخطة رفعها مستخدم آخر)
+def get_incremental_scheduler(courses_hash, max_hours, catalog):
+    key = (courses_hash, max_hours)
+    saved = st.session_state.get("incremental_scheduler")
+    if saved is None or saved[0] != key:
+        saved = (key, IncrementalScheduler(catalog, max_hours))
+        st.session_state.incremental_scheduler = saved
+    return saved[1]
+
 if courses_file is not None and students_file is not None:
     try:
-        # قراءة ملفات الإكسل
-        courses_df = pd.read_excel(courses_file)
-        students_df = pd.read_excel(students_file)
-        
-        # تنظيف بيانات المقررات: إزالة المسافات الزائدة من رموز المقررات والمتطلبات السابقة
-        courses_df['CourseCode'] = courses_df['CourseCode'].astype(str).str.strip()
-        courses_df['Pre-Requisite'] = courses_df['Pre-Requisite'].astype(str).str.strip()
-        
-        # تنظيف أسماء أعمدة بيانات الطلاب: إزالة المسافات الزائدة
-        students_df.columns = [col.strip() if isinstance(col, str) else col for col in students_df.columns]
-        
-        # تنظيف قيم البيانات في خلايا بيانات الطلاب (خاصةً في أعمدة المقررات)
-        # حيث نقوم بتحويل كل قيمة إلى نص وإزالة المسافات الزائدة، مع المحافظة على قيم غير نصية كما هي
-        def clean_value(val):
-            if isinstance(val, str):
-                return val.strip()
-            return val
+        # قراءة ملفات الإكسل (يُقرأ ملف المقررات ويُنظّف مرة واحدة فقط لكل محتوى جديد)
+        courses_bytes = courses_file.getvalue()
+        courses_hash = content_hash(courses_bytes)
+        catalog = load_course_catalog(courses_hash, courses_bytes)
+        students_bytes = students_file.getvalue()
+        students_df = pd.read_excel(io.BytesIO(students_bytes))
+
+        if catalog.cyclic_courses:
+            st.warning("توجد حلقة في المتطلبات السابقة للمقررات التالية: " + ", ".join(catalog.cyclic_courses))
         
-        students_df = students_df.applymap(clean_value)
+        # تنظيف أسماء الأعمدة وقيم الخلايا في بيانات الطلاب (خاصةً في أعمدة المقررات)
+        students_df = clean_student_plan(students_df)
         
         # st.subheader("بيانات المقررات")
         # st.dataframe(courses_df)
@@ -44,100 +56,37 @@ if courses_file is not None and students_file is not None:
         # st.subheader("بيانات الخطة الدراسية")
         # st.dataframe(students_df)
         
-        # تحويل عمود الساعات إلى نوع رقمي
-        courses_df['Hours'] = pd.to_numeric(courses_df['Hours'], errors='coerce')
-        
-        # مجموعة الحالات التي تعتبر نجاح الطالب للمقرر
-        passed_statuses = {'$', 'XM', 'A', '+A', 'B', '+B', 'C', '+C', '+D', 'D','P'}
-        
-        def generate_student_schedule(courses_df, students_df, max_hours):
-            """
-            تقوم الدالة بتوليد جدول دراسي لكل طالب على النحو التالي:
-            - ترتيب المقررات حسب العمود "Level".
-            - لكل طالب يتم المرور على المقررات التي لم يجتزها بعد (بافتراض أن الحالة "-" تعني عدم الاجتياز).
-            - يتم التحقق من أن الطالب قد اجتاز المتطلب السابق (أي أن حالة المقرر الخاص بالمتطلب ضمن passed_statuses) إن وُجد.
-            - تُضاف المقررات إلى جدول الطالب طالما لا يتجاوز مجموع الساعات قيمة max_hours.
-            - تُحدّث الدالة ملخصاً بعدد الطلاب المحتمل لكل مقرر.
-            """
-            summary = {}          # لتجميع عدد الطلاب لكل مقرر
-            student_schedules = {}  # لتخزين الجدول الدراسي لكل طالب
-            
-            # ترتيب المقررات حسب "Level"
-            courses_df_sorted = courses_df.sort_values(by='Level')
-            
-            # المرور على كل طالب في بيانات الخطة الدراسية
-            for _, student in students_df.iterrows():
-                student_id = student['ID']
-                total_hours = 0
-                schedule = []  # قائمة المقررات المختارة للطالب
-                
-                # المرور على كل مقرر من ملف المقررات
-                for _, course_row in courses_df_sorted.iterrows():
-                    course_code = course_row['CourseCode']
-                    course_hours = course_row['Hours']
-                    prerequisite = course_row['Pre-Requisite']
-                    
-                    # التأكد من وجود عمود المقرر في بيانات الطلاب (مع مراعاة التنظيف)
-                    if course_code not in students_df.columns:
-                        continue
-                    
-                    # استرجاع حالة الطالب للمقرر وتنظيف القيمة إن كانت نصية
-                    status = student[course_code]
-                    if isinstance(status, str):
-                        status = status.strip()
-                    
-                    # إذا كان الطالب قد اجتاز المقرر (وفقاً للحالات المحددة) فلا داعي لإضافته مرة أخرى
-                    if status in passed_statuses:
-                        continue
-                    
-                    # إذا كانت حالة المقرر "-" فهذا يعني أن المقرر لم يُجتز بعد.
-                    # التحقق من المتطلب السابق، إذا كان موجوداً:
-                    if pd.isna(prerequisite) or prerequisite == '' or prerequisite == '-' or prerequisite.lower()=='nan':
-                        prereq_satisfied = True
-                    else:
-                        # التأكد من وجود عمود المتطلب في بيانات الطلاب
-                        if prerequisite not in students_df.columns:
-                            prereq_satisfied = False
-                        else:
-                            prereq_status = student[prerequisite]
-                            if isinstance(prereq_status, str):
-                                prereq_status = prereq_status.strip()
-                            # يعتبر المتطلب مستوفى إذا كانت حالته ضمن passed_statuses
-                            prereq_satisfied = prereq_status in passed_statuses
-                    
-                    if not prereq_satisfied:
-                        continue
-                    
-                    # التحقق من عدم تجاوز مجموع الساعات الحد الأقصى (20 ساعة)
-                    if total_hours + course_hours <= max_hours:
-                        schedule.append(course_code)
-                        total_hours += course_hours
-                        summary[course_code] = summary.get(course_code, 0) + 1
-                
-                student_schedules[student_id] = schedule
-            
-            return student_schedules, summary
-        
         # توليد الجداول الدراسية والملخص
         max_hours = st.number_input("أدخل الحد الأقصى للساعات لكل طالب", min_value=1, value=20, step=1)
 
+        # وضع التحسين: توزيع الطلاب على المقررات مع مراعاة سعة الشعب (الوضع الافتراضي هو الطريقة السريعة)
+        optimal_mode = st.checkbox("وضع التحسين مع مراعاة سعة الشعب (أبطأ)", value=False)
+        default_sections, default_seats = None, None
+        if optimal_mode:
+            capacity_cols = st.columns(2)
+            with capacity_cols[0]:
+                default_sections = st.number_input("عدد الشعب الافتراضي لكل مقرر", min_value=1, value=1, step=1)
+            with capacity_cols[1]:
+                default_seats = st.number_input("عدد المقاعد الافتراضي في الشعبة", min_value=1, value=30, step=1)
+            st.caption("تُستخدم القيم الافتراضية للمقررات التي لا تحتوي على قيمة في العمودين Sections و Capacity في ملف المقررات.")
+
+        # مفتاح النتيجة المحفوظة: يتغير عند تغيير أي من الملفين أو إعدادات التوليد
+        result_key = (courses_hash, content_hash(students_bytes), max_hours, optimal_mode, default_sections, default_seats)
+
         if st.button("ولد الجدول"):
-            student_schedules, summary = generate_student_schedule(courses_df, students_df, max_hours)
-            
-            st.header("الجدول الدراسي للفصل القادم لكل طالب")
-            # for sid, sched in student_schedules.items():
-            #     if sched:
-            #         st.markdown(f"**الطالب {sid}:** " + ", ".join(sched))
-            #     else:
-            #         st.markdown(f"**الطالب {sid}:** لا توجد مقررات متاحة (أو لا تحقق شروط المتطلب السابق)")
-            
-            
-            # تحويل student_schedules إلى DataFrame لعرضه كمخطط Seaborn (Heatmap)
-            # سنقوم بإنشاء مصفوفة حيث تمثل الصفوف رقم الطالب والأعمدة تمثل المقررات.
-            # إذا كان المقرر موجودًا في جدول الطالب نضع القيمة 1 وإلا 0.
-# إنشاء جدول من متغير student_schedules بحيث يكون لكل طالب صف مع أعمدة المقررات
-# حساب الحد الأقصى لعدد المقررات المقترحة لأي طالب (لإنشاء أعمدة ثابتة)
-            max_courses = max(len(sched) for sched in student_schedules.values())
+            if optimal_mode:
+                with st.spinner("جارٍ حساب التوزيع الأمثل..."):
+                    capacities = catalog.capacities(default_sections, default_seats)
+                    student_schedules, summary = schedule_optimal(catalog, students_df, max_hours, capacities)
+            else:
+                # يتم توليد الجداول دفعة واحدة بعمليات مصفوفات، ويُعاد حساب الطلاب الذين تغيرت بياناتهم فقط
+                scheduler = get_incremental_scheduler(courses_hash, max_hours, catalog)
+                student_schedules, summary, recomputed = scheduler.update(students_df)
+                st.caption(f"تم حساب جداول {recomputed} طالب من أصل {len(student_schedules)} (البقية دون تغيير منذ آخر توليد).")
+
+            # إنشاء جدول من متغير student_schedules بحيث يكون لكل طالب صف مع أعمدة المقررات
+            # حساب الحد الأقصى لعدد المقررات المقترحة لأي طالب (لإنشاء أعمدة ثابتة)
+            max_courses = max((len(sched) for sched in student_schedules.values()), default=0)
             
             # بناء قائمة من الصفوف: كل صف يبدأ برقم الطالب ثم المقررات المتاحة، مع تعبئة فراغات إذا كانت أقل من max_courses
             table_data = []
@@ -155,24 +104,65 @@ if courses_file is not None and students_file is not None:
             # تعريف لوحة ألوان (يمكنك تعديل الألوان أو إضافة المزيد منها)
             color_palette = ['#FFCCCC', '#CCFFCC', '#CCCCFF', '#FFFFCC', '#CCFFFF', '#FFCCFF', '#E0E0E0', '#FFDAB9', '#D8BFD8', '#F0E68C']
             course_color_mapping = {course: color_palette[i % len(color_palette)] for i, course in enumerate(unique_courses)}
-            
+
+            # حفظ النتيجة في حالة الجلسة حتى يبقى الجدول معروضاً عند التصفية أو التنقل بين الصفحات
+            st.session_state.timetable_result = {
+                "key": result_key,
+                "table": table_df,
+                "summary": summary,
+                "courses": unique_courses,
+                "colors": course_color_mapping,
+            }
+
+        result = st.session_state.get("timetable_result")
+        if result is not None and result["key"] == result_key:
+            table_df = result["table"]
+            course_color_mapping = result["colors"]
+            course_columns = list(table_df.columns[1:])
+
             # دالة لتلوين الخلية بناءً على قيمة المقرر (في الأعمدة من "Course 1" فصاعداً)
             def highlight_course(val):
                 if val in course_color_mapping:
                     return f'background-color: {course_color_mapping[val]};'
                 else:
                     return ''
-            
-            # تطبيق التلوين على أعمدة المقررات (باستثناء عمود "Student ID")
-            styled_table = table_df.style.applymap(highlight_course, subset=table_df.columns[1:])
-            
-            # عرض الجدول داخل Streamlit باستخدام st.markdown مع تحويل النتيجة إلى HTML
+
             st.header("الجدول الدراسي المقترح لكل طالب مع ألوان المقررات")
-            st.markdown(styled_table.to_html(), unsafe_allow_html=True)
+
+            # التصفية حسب رقم الطالب أو المقرر
+            filter_cols = st.columns(3)
+            with filter_cols[0]:
+                student_filter = st.text_input("بحث برقم الطالب", key="student_filter").strip()
+            with filter_cols[1]:
+                course_filter = st.selectbox("تصفية حسب المقرر", ["الكل"] + result["courses"], key="course_filter")
+            with filter_cols[2]:
+                page_size = st.selectbox("عدد الطلاب في الصفحة", [25, 50, 100, 200], index=1, key="page_size")
+
+            mask = pd.Series(True, index=table_df.index)
+            if student_filter:
+                mask &= table_df["Student ID"].astype(str).str.contains(student_filter, regex=False)
+            if course_filter != "الكل" and course_columns:
+                mask &= (table_df[course_columns] == course_filter).any(axis=1)
+            filtered_df = table_df[mask]
+
+            # عرض صفحة واحدة فقط، بحيث تتناسب كلفة العرض مع ما يظهر على الشاشة
+            n_pages = max(1, -(-len(filtered_df) // page_size))
+            # عند تقليل عدد الصفحات بالتصفية يُعاد رقم الصفحة المحفوظ إلى آخر صفحة متاحة قبل إنشاء الحقل
+            # (بدون value للحقل، فالقيمة الابتدائية هي min_value ولا يتعارض ذلك مع الضبط عبر session_state)
+            if st.session_state.get("table_page", 1) > n_pages:
+                st.session_state.table_page = n_pages
+            page = st.number_input("الصفحة", min_value=1, max_value=n_pages, step=1, key="table_page")
+            start = (page - 1) * page_size
+            page_df = filtered_df.iloc[start:start + page_size]
+
+            # تطبيق التلوين على أعمدة المقررات في الصفحة الحالية فقط (باستثناء عمود "Student ID")
+            styled_page = page_df.style.applymap(highlight_course, subset=course_columns)
+            st.dataframe(styled_page, hide_index=True, use_container_width=True)
+            st.caption(f"عرض {min(start + 1, len(filtered_df))} - {start + len(page_df)} من {len(filtered_df)} طالب (صفحة {page} من {n_pages})")
 
 
             st.header("ملخص المواد وعدد الطلاب المحتمل في كل مادة")
-            summary_df = pd.DataFrame(list(summary.items()), columns=['CourseCode', 'Number of Students'])
+            summary_df = catalog.summary_frame(result["summary"])
             st.dataframe(summary_df)
             
     except Exception as e:
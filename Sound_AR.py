@@ -2,7 +2,8 @@ import streamlit as st
 import sounddevice as sd
 from scipy.io.wavfile import write
 import speech_recognition as sr
-import librosa
+
+from audio_worker import AudioFeatureService, QueueFullError
 
 # Function to record audio
 def record_audio(filename="speech.wav", duration=30, fs=44100):
@@ -26,16 +27,19 @@ def transcribe_audio(file_path):
     except Exception as e:
         return f"خطأ: {str(e)}"
 
-# Function to extract speech features
+# Feature extraction runs in worker processes shared by all sessions
+@st.cache_resource
+def get_audio_service():
+    return AudioFeatureService()
+
+# Function to extract speech features (tempo = speech speed, energy = loudness, pitch = average voiced pitch)
 def extract_speech_features(file_path):
     try:
-        y, sr = librosa.load(file_path, sr=None)
-        features = {
-            "tempo": librosa.beat.tempo(y, sr=sr)[0],  # Speech speed
-            "energy": librosa.feature.rms(y=y).mean(),  # Loudness
-            "pitch": librosa.yin(y, fmin=50, fmax=300).mean(),  # Average pitch
-        }
-        return features
+        with open(file_path, "rb") as f:
+            return get_audio_service().extract(f.read(), "summary")
+    except QueueFullError as e:
+        st.warning(f"الخادم مشغول بتحليل تسجيلات أخرى ({e.pending} قيد التحليل)، يرجى المحاولة بعد قليل.")
+        return None
     except Exception as e:
         st.error(f"خطأ أثناء استخراج خصائص الصوت: {str(e)}")
         return None
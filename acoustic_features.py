@@ -0,0 +1,144 @@
+"""
+Acoustic feature extraction for the voice analysis apps: extract_features for the
+personality analysis (HandSpeech.py), speech_summary for Sound_AR.py and prosody_features
+for main_SpeechBased.py. They are plain functions of (y, sr) with no Streamlit calls, so
+audio_worker.py can run them in worker processes.
+
+extract_features analyses a recording in a single pass over shared intermediates:
+    one magnitude STFT       -> MFCCs (through the mel spectrogram) and spectral centroid
+    one framing of the wave  -> RMS energy and zero crossing rate
+    one pitch track          -> F0 mean/std and jitter
+and shimmer reuses the RMS frames, so the audio is never decoded, framed or
+pitch-tracked twice. Pitch tracking dominates the cost; its speed/accuracy tier
+(pitch.py) is chosen per deployment with the PITCH_TIER environment variable.
+If pitch tracking fails, the recording is treated as unvoiced and the other
+features are still returned.
+"""
+import sys
+
+import librosa
+import numpy as np
+
+from pitch import HOP_LENGTH, SPEECH_F0_MAX, SPEECH_F0_MIN, estimate_f0
+
+FRAME_LENGTH = 2048
+N_MFCC = 13
+ZERO_THRESHOLD = 1e-10  # |sample| at or below this counts as zero (librosa.zero_crossings' default)
+
+
+def safe_f0(y, sr, pitch_tier=None, fmin=SPEECH_F0_MIN, fmax=SPEECH_F0_MAX, hop_length=HOP_LENGTH):
+    """pitch.estimate_f0, or all frames unvoiced (NaN) if pitch tracking fails."""
+    try:
+        return estimate_f0(y, sr, pitch_tier, fmin, fmax, hop_length)
+    except Exception as e:
+        print(f"Error extracting pitch: {e}", file=sys.stderr)
+        return np.full(1 + len(y) // hop_length, np.nan)
+
+
+def rms_zcr(y, frame_length=FRAME_LENGTH, hop_length=HOP_LENGTH):
+    """
+    RMS energy and zero crossing rate per frame from one centered, zero-padded framing of `y`.
+    RMS equals librosa.feature.rms; librosa.feature.zero_crossing_rate pads with the edge
+    samples instead of zeros, so only its first and last frames can differ.
+    """
+    frames = librosa.util.frame(np.pad(y, frame_length // 2), frame_length=frame_length, hop_length=hop_length, axis=0)
+    rms = np.sqrt(np.mean(np.square(frames), axis=1))
+    negative = frames < -ZERO_THRESHOLD
+    zcr = np.count_nonzero(negative[:, 1:] != negative[:, :-1], axis=1) / frame_length
+    return rms, zcr
+
+
+def pitch_stats(f0):
+    """Mean and standard deviation of the voiced F0 values (NaN = unvoiced), or (None, None)."""
+    voiced = f0[~np.isnan(f0)]
+    if len(voiced) == 0:
+        return None, None
+    return float(np.mean(voiced)), float(np.std(voiced))
+
+
+def jitter_shimmer(f0, rms):
+    """
+    Approximate jitter and shimmer (not Praat's algorithms): jitter is the mean absolute
+    difference between consecutive pitch periods divided by the mean period, and shimmer
+    the same relative difference over the RMS frames, each frame standing in for a period.
+    """
+    voiced = f0[~np.isnan(f0)]
+    if len(voiced) < 2:
+        return None, None
+    periods = 1.0 / voiced
+    jitter = float(np.mean(np.abs(np.diff(periods))) / np.mean(periods))
+    shimmer = float(np.mean(np.abs(np.diff(rms))) / np.mean(rms)) if len(rms) >= 2 else None
+    return jitter, shimmer
+
+
+def extract_features(
+    y, sr, pitch_tier=None, fmin=SPEECH_F0_MIN, fmax=SPEECH_F0_MAX, frame_length=FRAME_LENGTH, hop_length=HOP_LENGTH
+):
+    """
+    All features of a mono recording `y` at sample rate `sr` (pitch_tier: see pitch.estimate_f0):
+      - mfccs_mean / mfccs_std: 13 coefficients
+      - f0_mean / f0_std: fundamental frequency of the voiced frames (Hz), None if none are voiced
+      - rms_mean, zcr_mean, spectral_centroid_mean
+      - jitter, shimmer
+      - duration (seconds)
+    """
+    magnitude = np.abs(librosa.stft(y, n_fft=frame_length, hop_length=hop_length))
+    mel = librosa.feature.melspectrogram(S=magnitude ** 2, sr=sr)
+    mfccs = librosa.feature.mfcc(S=librosa.power_to_db(mel), n_mfcc=N_MFCC)
+    spectral_centroid = librosa.feature.spectral_centroid(S=magnitude, sr=sr, n_fft=frame_length)[0]
+
+    rms, zcr = rms_zcr(y, frame_length, hop_length)
+
+    f0 = safe_f0(y, sr, pitch_tier, fmin, fmax, hop_length)
+    f0_mean, f0_std = pitch_stats(f0)
+    jitter, shimmer = jitter_shimmer(f0, rms)
+
+    return {
+        "mfccs_mean": np.mean(mfccs, axis=1).tolist(),
+        "mfccs_std": np.std(mfccs, axis=1).tolist(),
+        "f0_mean": f0_mean,
+        "f0_std": f0_std,
+        "rms_mean": float(np.mean(rms)),
+        "zcr_mean": float(np.mean(zcr)),
+        "spectral_centroid_mean": float(np.mean(spectral_centroid)),
+        "jitter": jitter,
+        "shimmer": shimmer,
+        "duration": len(y) / sr,
+    }
+
+
+def speech_summary(y, sr, pitch_tier=None):
+    """Speech speed (tempo), loudness (mean RMS) and average pitch of the voiced frames."""
+    f0 = safe_f0(y, sr, pitch_tier)
+    return {
+        "tempo": float(librosa.feature.tempo(y=y, sr=sr)[0]),
+        "energy": float(librosa.feature.rms(y=y).mean()),
+        "pitch": float(np.nanmean(f0)) if np.isfinite(f0).any() else float("nan"),
+    }
+
+
+def prosody_features(y, sr, pitch_tier=None):
+    """
+    (pitch, speech_rate, intensity, prosody_variation, pause_duration) of the recording with
+    leading and trailing silence trimmed; pitch is 0 when nothing is voiced.
+    """
+    y, _ = librosa.effects.trim(y)
+
+    f0 = safe_f0(y, sr, pitch_tier)
+    pitch = float(np.nanmean(f0)) if np.isfinite(f0).any() else 0.0
+
+    # speech rate: non-silent intervals per second of speech
+    intervals = librosa.effects.split(y, top_db=20)
+    speech_duration = sum((end - start) for start, end in intervals) / sr
+    speech_rate = float(len(intervals) / speech_duration) if speech_duration > 0 else 0.0
+
+    rms = librosa.feature.rms(y=y)
+    intensity = "dynamic" if np.std(rms) > 0.05 else "steady"
+
+    prosody_variation = float(np.std(librosa.feature.mfcc(y=y, sr=sr)))
+
+    # average pause between consecutive intervals (next start - previous end)
+    pauses = intervals[1:, 0] - intervals[:-1, 1]
+    pause_duration = float(np.mean(pauses) / sr) if len(pauses) else 0.0
+
+    return pitch, speech_rate, intensity, prosody_variation, pause_duration
@@ -0,0 +1,103 @@
+"""
+In-memory audio ingestion for the voice apps (HandSpeech.py, main_SpeechBased.py).
+
+Recorder bytes are decoded straight from memory, without temporary files: 16-bit PCM WAV
+(what the browser recorders produce) is read as a zero-copy NumPy view over the RIFF
+`data` chunk, and any other format goes through soundfile on a BytesIO. The signal is
+mixed to mono and resampled once to ANALYSIS_SR, and the resulting Recording is the single
+buffer handed to both speech recognition (`audio_data()`) and feature extraction
+(`samples()`, or sent as-is to audio_worker.py).
+"""
+import io
+import math
+import struct
+
+import numpy as np
+import scipy.signal
+
+ANALYSIS_SR = 16000  # Hz, the usual rate for speech recognition; speech F0 and formants fit well below 8 kHz
+WAVE_FORMAT_PCM = 1
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+class Recording:
+    """Mono 16-bit PCM at `sr`: compact to keep in session state or pickle to a worker."""
+
+    __slots__ = ("pcm", "sr")
+
+    def __init__(self, pcm, sr):
+        self.pcm = pcm
+        self.sr = sr
+
+    @classmethod
+    def from_samples(cls, y, sr):
+        """From floating point samples in [-1, 1]."""
+        return cls(np.clip(np.rint(np.asarray(y) * 32767), -32768, 32767).astype(np.int16), sr)
+
+    @property
+    def duration(self):
+        return len(self.pcm) / self.sr
+
+    def samples(self):
+        """float32 samples in [-1, 1) as librosa expects."""
+        return self.pcm.astype(np.float32) / 32768
+
+    def audio_data(self):
+        """speech_recognition.AudioData over the same PCM (no WAV file round trip)."""
+        import speech_recognition
+
+        return speech_recognition.AudioData(self.pcm.tobytes(), self.sr, 2)
+
+
+def parse_wav(data):
+    """
+    (int16 array of shape (frames, channels), sample rate) viewing the `data` chunk of a
+    16-bit PCM WAV in `data` without copying. Raises ValueError for anything else.
+    """
+    buffer = memoryview(data)
+    if len(buffer) < 12 or bytes(buffer[:4]) != b"RIFF" or bytes(buffer[8:12]) != b"WAVE":
+        raise ValueError("not a RIFF/WAVE file")
+    fmt = None
+    offset = 12
+    while offset + 8 <= len(buffer):
+        chunk_id = bytes(buffer[offset:offset + 4])
+        (size,) = struct.unpack_from("<I", buffer, offset + 4)
+        body = offset + 8
+        if chunk_id == b"fmt ":
+            fmt = struct.unpack_from("<HHIIHH", buffer, body)
+        elif chunk_id == b"data":
+            if fmt is None:
+                raise ValueError("WAV data chunk before fmt chunk")
+            audio_format, channels, sample_rate, _, _, bits = fmt
+            if audio_format not in (WAVE_FORMAT_PCM, WAVE_FORMAT_EXTENSIBLE) or bits != 16:
+                raise ValueError(f"unsupported WAV encoding (format {audio_format}, {bits} bits)")
+            # streaming recorders may leave the size as 0 or 0xFFFFFFFF: take what is there
+            size = len(buffer) - body if size == 0 or body + size > len(buffer) else size
+            frames = size // (2 * channels)
+            pcm = np.frombuffer(buffer, dtype="<i2", count=frames * channels, offset=body)
+            return pcm.reshape(frames, channels), sample_rate
+        offset = body + size + (size & 1)
+    raise ValueError("WAV file has no data chunk")
+
+
+def resample(y, orig_sr, target_sr):
+    """Polyphase resampling (exact rational ratio) of float samples."""
+    if orig_sr == target_sr:
+        return y
+    divisor = math.gcd(int(orig_sr), int(target_sr))
+    return scipy.signal.resample_poly(y, target_sr // divisor, orig_sr // divisor).astype(np.float32)
+
+
+def decode(data, sr=ANALYSIS_SR):
+    """Recording (mono, `sr` Hz) from encoded audio bytes; sr=None keeps the original rate."""
+    try:
+        pcm, source_sr = parse_wav(data)
+        if pcm.shape[1] == 1 and (sr is None or sr == source_sr):
+            return Recording(pcm[:, 0], source_sr)
+        y = pcm.mean(axis=1, dtype=np.float32) / 32768
+    except ValueError:
+        import soundfile
+
+        y, source_sr = soundfile.read(io.BytesIO(data), dtype="float32", always_2d=True)
+        y = y.mean(axis=1)
+    return Recording.from_samples(resample(y, source_sr, sr or source_sr), sr or source_sr)
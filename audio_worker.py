@@ -0,0 +1,137 @@
+"""
+Process pool for audio feature extraction (HandSpeech.py, Sound_AR.py, main_SpeechBased.py).
+
+librosa's analysis holds the GIL for long stretches, so running it in the Streamlit script
+thread makes every other student's page lag while a recording is analysed. The apps instead
+send the recording (an audio_io.Recording, or encoded bytes to be decoded by the worker)
+to AudioFeatureService, which analyses it in worker processes and returns the small
+feature record (floats and short lists, never the signal).
+
+    service = AudioFeatureService(workers=2)
+    features = service.extract(audio_io.decode(audio_bytes), "voice", timeout=120)
+    service.stats()  # queue depth and per-job latency (queue wait + run time), p50 / p95
+
+Workers are started with the "spawn" method (forking the multi-threaded Streamlit server
+is unsafe) and warm up librosa's compiled code before taking jobs. At most `max_pending`
+jobs may be unfinished; beyond that submit() raises QueueFullError.
+"""
+import multiprocessing
+import os
+import statistics
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from audio_io import Recording, decode
+
+DEFAULT_WORKERS = max(1, (os.cpu_count() or 2) // 2)
+DEFAULT_MAX_PENDING = 16
+DEFAULT_TIMEOUT = 300  # seconds to wait for one job's result
+
+EXTRACTORS = {
+    "voice": "extract_features",
+    "summary": "speech_summary",
+    "prosody": "prosody_features",
+}
+
+
+class QueueFullError(Exception):
+    def __init__(self, pending, max_pending):
+        super().__init__(f"{pending} audio jobs unfinished (limit {max_pending})")
+        self.pending = pending
+        self.max_pending = max_pending
+
+
+def init_worker():
+    """Import librosa and compile pyin's numba kernels once per worker, not on the first job."""
+    import acoustic_features
+
+    y = np.sin(2 * np.pi * 150 * np.arange(22050) / 22050).astype(np.float32)
+    for function in EXTRACTORS.values():
+        getattr(acoustic_features, function)(y, 22050)
+
+
+def run_job(kind, audio, options):
+    """Analyse one recording (decoding it first if given as bytes) in a worker; returns (features, run seconds)."""
+    import acoustic_features
+
+    start = time.perf_counter()
+    recording = audio if isinstance(audio, Recording) else decode(audio)
+    features = getattr(acoustic_features, EXTRACTORS[kind])(recording.samples(), recording.sr, **options)
+    return features, time.perf_counter() - start
+
+
+class AudioFeatureService:
+    """Shared by all sessions of an app process (create it through st.cache_resource)."""
+
+    def __init__(self, workers=DEFAULT_WORKERS, max_pending=DEFAULT_MAX_PENDING, max_metrics=1000):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.metrics = deque(maxlen=max_metrics)
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn"), initializer=init_worker
+        )
+
+    def submit(self, audio, kind="voice", **options):
+        """
+        Queue the analysis of a Recording or of encoded audio bytes (e.g. WAV from the browser
+        recorder) with the extractor `kind` ("voice", "summary" or "prosody", see EXTRACTORS)
+        and return a Future of the feature record. Options go to the extractor (e.g. pitch_tier).
+        """
+        if kind not in EXTRACTORS:
+            raise ValueError(f"unknown audio extractor {kind!r} (expected one of {sorted(EXTRACTORS)})")
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise QueueFullError(self._pending, self.max_pending)
+            self._pending += 1
+        submitted = time.perf_counter()
+        try:
+            job = self._executor.submit(run_job, kind, audio if isinstance(audio, Recording) else bytes(audio), options)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            raise
+        job.add_done_callback(lambda job: self._finished(job, kind, submitted))
+        return job
+
+    def extract(self, audio, kind="voice", timeout=DEFAULT_TIMEOUT, **options):
+        """Submit and wait for the feature record (the calling thread only sleeps meanwhile)."""
+        features, _ = self.submit(audio, kind, **options).result(timeout)
+        return features
+
+    def _finished(self, job, kind, submitted):
+        total = time.perf_counter() - submitted
+        error = job.exception()
+        run = None if error is not None else job.result()[1]
+        with self._lock:
+            self._pending -= 1
+            self.metrics.append({
+                "kind": kind,
+                "total": total,
+                "run": run,
+                "queued": total - run if run is not None else None,
+                "error": None if error is None else f"{type(error).__name__}: {error}",
+                "timestamp": time.time(),
+            })
+
+    def stats(self):
+        """Unfinished jobs and the median / 95th percentile latencies of the recorded jobs."""
+        with self._lock:
+            metrics = list(self.metrics)
+            result = {"pending": self._pending, "workers": self.workers, "max_pending": self.max_pending}
+        succeeded = [m for m in metrics if m["error"] is None]
+        result.update({"jobs": len(metrics), "failed": len(metrics) - len(succeeded)})
+        for key in ("queued", "run", "total"):
+            values = sorted(m[key] for m in succeeded)
+            if values:
+                result[f"{key}_p50"] = statistics.median(values)
+                result[f"{key}_p95"] = values[min(len(values) - 1, int(0.95 * len(values)))]
+        return result
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
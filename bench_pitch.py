@@ -0,0 +1,122 @@
+"""
+Speed and agreement of the pitch tiers in pitch.py.
+
+Examples:
+    python bench_pitch.py
+    python bench_pitch.py recordings/*.wav --repeat 3
+    python bench_pitch.py --duration 60 --sample-rates 22050 44100 --output bench_pitch.csv
+
+Without recordings, synthetic voices are generated (harmonic tone with a gliding F0 around
+a low, a middle and a high speaking pitch, pauses, and background noise), and each tier
+is also compared with the true F0. For every recording and tier this reports the best
+time over --repeat runs and, against the "accurate" tier (pyin), the voicing agreement,
+the median absolute difference in cents over frames both call voiced, and the share of
+gross errors (more than 50 cents). The "legacy" row is the previous HandSpeech call:
+pyin over C2..C7.
+"""
+import argparse
+import time
+
+import librosa
+import numpy as np
+import pandas as pd
+
+from pitch import HOP_LENGTH, TIERS, estimate_f0
+
+SYNTHETIC_VOICES = {"low": 110.0, "middle": 200.0, "high": 300.0}
+GROSS_ERROR_CENTS = 50
+
+
+def legacy_f0(y, sr):
+    f0, _, _ = librosa.pyin(y, fmin=librosa.note_to_hz("C2"), fmax=librosa.note_to_hz("C7"), sr=sr, hop_length=HOP_LENGTH)
+    return f0
+
+
+def make_voice(base_f0, duration, sr, seed=0):
+    """Synthetic voiced speech: F0 gliding +-25% around base_f0, ~40% pauses, noise at -40 dB."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(duration * sr)) / sr
+    f0 = base_f0 * (1 + 0.25 * np.sin(2 * np.pi * 0.3 * t + rng.uniform(0, 2 * np.pi)))
+    phase = 2 * np.pi * np.cumsum(f0) / sr
+    y = sum(np.sin(k * phase) / k for k in range(1, 8)) * 0.2
+    voiced = np.sin(2 * np.pi * 0.45 * t + rng.uniform(0, 2 * np.pi)) > -0.3
+    y = y * voiced + 0.002 * rng.standard_normal(len(t))
+    truth = np.where(voiced, f0, np.nan)
+    return y.astype(np.float32), truth[::HOP_LENGTH][:1 + len(t) // HOP_LENGTH]
+
+
+def compare(f0, reference):
+    """Agreement of f0 with reference (same hop; frames are aligned and trimmed to the shorter)."""
+    n = min(len(f0), len(reference))
+    f0, reference = f0[:n], reference[:n]
+    voiced, reference_voiced = ~np.isnan(f0), ~np.isnan(reference)
+    both = voiced & reference_voiced
+    cents = np.abs(1200 * np.log2(f0[both] / reference[both]))
+    return {
+        "voicing_agreement": float(np.mean(voiced == reference_voiced)),
+        "median_cents": float(np.median(cents)) if len(cents) else np.nan,
+        "gross_error_rate": float(np.mean(cents > GROSS_ERROR_CENTS)) if len(cents) else np.nan,
+    }
+
+
+def best_time(function, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def bench_recording(name, y, sr, repeat, truth=None):
+    rows = []
+    estimators = {"legacy": lambda: legacy_f0(y, sr)}
+    estimators.update({tier: (lambda tier=tier: estimate_f0(y, sr, tier)) for tier in TIERS})
+    results = {}
+    for tier, function in estimators.items():
+        seconds, results[tier] = best_time(function, repeat)
+        rows.append({"recording": name, "sample_rate": sr, "duration": len(y) / sr, "tier": tier, "seconds": seconds})
+    for row in rows:
+        f0 = results[row["tier"]]
+        row.update(compare(f0, results["accurate"]))
+        if truth is not None:
+            row.update({f"truth_{key}": value for key, value in compare(f0, truth).items()})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the pitch estimation tiers.")
+    parser.add_argument("recordings", nargs="*", help="audio files (synthetic voices if omitted)")
+    parser.add_argument("--duration", type=float, default=60, help="seconds per synthetic voice")
+    parser.add_argument("--sample-rates", type=int, nargs="+", default=[22050, 44100], help="rates for synthetic voices")
+    parser.add_argument("--repeat", type=int, default=2, help="runs per tier (best time is reported)")
+    parser.add_argument("--output", help="also write the results to this CSV file")
+    args = parser.parse_args()
+
+    # warm up numba-compiled parts of pyin so the first tier is not charged for compilation
+    estimate_f0(np.zeros(22050, dtype=np.float32), 22050, "accurate")
+
+    rows = []
+    if args.recordings:
+        for path in args.recordings:
+            y, sr = librosa.load(path, sr=None, mono=True)
+            rows += bench_recording(path, y, sr, args.repeat)
+    else:
+        for sr in args.sample_rates:
+            for seed, (name, base_f0) in enumerate(SYNTHETIC_VOICES.items()):
+                y, truth = make_voice(base_f0, args.duration, sr, seed)
+                rows += bench_recording(f"synthetic-{name}", y, sr, args.repeat, truth)
+
+    results = pd.DataFrame(rows)
+    speedup = results.groupby(["recording", "sample_rate"])["seconds"].transform(
+        lambda seconds: seconds[results.loc[seconds.index, "tier"] == "legacy"].iloc[0] / seconds
+    )
+    results.insert(results.columns.get_loc("seconds") + 1, "speedup_vs_legacy", speedup)
+    with pd.option_context("display.width", 200, "display.max_columns", None, "display.precision", 3):
+        print(results.to_string(index=False))
+    if args.output:
+        results.to_csv(args.output, index=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""
+قياس أداء توليد الجداول الدراسية على دفعات طلاب اصطناعية بأحجام مختلفة.
+
+أمثلة:
+    python bench_timetable.py
+    python bench_timetable.py --sizes 100 1000 10000 100000 --courses 60 --depth 4 --pass-rate 0.7
+    python bench_timetable.py --sizes 1000 --optimal --output bench_results.csv
+
+لكل حجم تُقاس كل طريقة (الزمن، أعلى استهلاك للذاكرة عبر tracemalloc) ويُتحقق من تطابق
+مخرجاتها مع النسخة المرجعية generate_student_schedule (أو مع الطريقة المجمّعة عندما يكون
+حجم الدفعة أكبر من --reference-max لأن النسخة المرجعية بطيئة جداً).
+"""
+import argparse
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from timetable_engine import (
+    PASSED_STATUSES,
+    CourseCatalog,
+    IncrementalScheduler,
+    generate_student_schedule,
+    generate_student_schedule_bulk,
+    schedule_optimal,
+    schedule_with_catalog,
+)
+
+# حالات لا تعتبر نجاحاً (لم يُسجل / راسب / منسحب)
+NOT_PASSED_STATUSES = ['-', 'F', 'W', 'DN']
+
+
+def make_catalog(n_courses=60, prereq_depth=4, hours_choices=(2, 3, 4), hours_weights=None, prereq_rate=0.6, seed=0):
+    """
+    كتالوج مقررات اصطناعي بنفس أعمدة ملف المقررات:
+    - تُوزع المقررات على 8 مستويات، ولكل مقرر متطلب سابق من المستوى الأقل باحتمال prereq_rate
+      بشرط ألا يتجاوز طول سلسلة المتطلبات prereq_depth.
+    - تُسحب الساعات من hours_choices بالأوزان hours_weights.
+    """
+    rng = np.random.default_rng(seed)
+    codes = [f"SYN{i:03d}" for i in range(n_courses)]
+    levels = np.sort(rng.integers(1, 9, size=n_courses))
+    hours = rng.choice(hours_choices, size=n_courses, p=hours_weights)
+    prerequisites = []
+    chain_length = np.zeros(n_courses, dtype=int)
+    for k in range(n_courses):
+        candidates = [
+            j for j in range(k)
+            if levels[j] < levels[k] and chain_length[j] < prereq_depth
+        ]
+        if candidates and rng.random() < prereq_rate:
+            parent = int(rng.choice(candidates))
+            prerequisites.append(codes[parent])
+            chain_length[k] = chain_length[parent] + 1
+        else:
+            prerequisites.append('-')
+    return pd.DataFrame({
+        'CourseCode': codes,
+        'Pre-Requisite': prerequisites,
+        'Hours': hours,
+        'Level': levels,
+    })
+
+
+def make_student_plan(courses_df, n_students, pass_rate=0.7, seed=0):
+    """
+    خطة دراسية اصطناعية: لكل طالب مستوى تقدم عشوائي، والمقررات في المستويات التي تجاوزها
+    مجتازة باحتمال pass_rate (بحالة من PASSED_STATUSES)، وما عداها "-" أو حالة رسوب.
+    """
+    rng = np.random.default_rng(seed + 1)
+    levels = courses_df['Level'].to_numpy()
+    progress = rng.integers(1, 10, size=n_students)
+    attempted = levels[None, :] < progress[:, None]
+    passed = attempted & (rng.random((n_students, len(levels))) < pass_rate)
+
+    passed_values = np.array(sorted(PASSED_STATUSES), dtype=object)
+    failed_values = np.array(NOT_PASSED_STATUSES[1:], dtype=object)
+    statuses = np.full((n_students, len(levels)), '-', dtype=object)
+    statuses[passed] = rng.choice(passed_values, size=int(passed.sum()))
+    failed = attempted & ~passed
+    statuses[failed] = rng.choice(failed_values, size=int(failed.sum()))
+
+    plan = pd.DataFrame(statuses, columns=courses_df['CourseCode'].tolist())
+    plan.insert(0, 'ID', np.arange(400000000, 400000000 + n_students))
+    return plan
+
+
+def measure(func, *args, **kwargs):
+    """يعيد (النتيجة، الزمن بالثواني، أعلى استهلاك للذاكرة بالميجابايت)."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        result = func(*args, **kwargs)
+    finally:
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return result, elapsed, peak / 2**20
+
+
+def run_incremental(catalog, students_df, max_hours, changed_fraction=0.01, seed=0):
+    """يقيس إعادة التوليد بعد تعديل نسبة صغيرة من الصفوف (التشغيل الأول خارج القياس)."""
+    scheduler = IncrementalScheduler(catalog, max_hours)
+    scheduler.update(students_df)
+    rng = np.random.default_rng(seed + 2)
+    updated = students_df.copy()
+    rows = rng.choice(len(updated), size=max(1, int(len(updated) * changed_fraction)), replace=False)
+    updated.iloc[rows, 1] = np.where(updated.iloc[rows, 1] == '-', 'A', '-')
+    result, elapsed, peak = measure(scheduler.update, updated)
+    return result[:2], elapsed, peak, updated
+
+
+def schedules_equal(left, right):
+    return left[0] == right[0] and left[1] == right[1] and list(left[0]) == list(right[0])
+
+
+def run(args):
+    records = []
+    courses_df = make_catalog(args.courses, args.depth, seed=args.seed)
+    catalog = CourseCatalog(courses_df)
+    for n_students in args.sizes:
+        students_df = make_student_plan(courses_df, n_students, args.pass_rate, seed=args.seed)
+
+        results = {}
+        if n_students <= args.reference_max:
+            results['reference'] = measure(generate_student_schedule, courses_df, students_df, args.max_hours)
+        results['bulk'] = measure(generate_student_schedule_bulk, courses_df, students_df, args.max_hours)
+        results['catalog'] = measure(schedule_with_catalog, catalog, students_df, args.max_hours)
+        baseline_name = 'reference' if 'reference' in results else 'bulk'
+        baseline = results[baseline_name][0]
+
+        for name, (output, elapsed, peak) in results.items():
+            records.append({
+                'engine': name,
+                'students': n_students,
+                'seconds': elapsed,
+                'rows_per_sec': n_students / elapsed if elapsed > 0 else float('inf'),
+                'peak_mb': peak,
+                'matches': 'baseline' if name == baseline_name else schedules_equal(output, baseline),
+            })
+
+        output, elapsed, peak, updated = run_incremental(catalog, students_df, args.max_hours, seed=args.seed)
+        expected = schedule_with_catalog(catalog, updated, args.max_hours)
+        records.append({
+            'engine': 'incremental(1%)',
+            'students': n_students,
+            'seconds': elapsed,
+            'rows_per_sec': n_students / elapsed if elapsed > 0 else float('inf'),
+            'peak_mb': peak,
+            'matches': schedules_equal(output, expected),
+        })
+
+        if args.optimal:
+            capacities = catalog.capacities(default_sections=1, default_seats=max(1, n_students // 4))
+            output, elapsed, peak = measure(schedule_optimal, catalog, students_df, args.max_hours, capacities)
+            records.append({
+                'engine': 'optimal',
+                'students': n_students,
+                'seconds': elapsed,
+                'rows_per_sec': n_students / elapsed if elapsed > 0 else float('inf'),
+                'peak_mb': peak,
+                'matches': 'n/a',
+            })
+        print(f"{n_students} طالب: تم", file=sys.stderr)
+    return pd.DataFrame(records)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="قياس أداء توليد الجداول الدراسية على بيانات اصطناعية.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000, 100000], help="أحجام دفعات الطلاب")
+    parser.add_argument("--courses", type=int, default=60, help="عدد المقررات في الكتالوج")
+    parser.add_argument("--depth", type=int, default=4, help="أقصى طول لسلسلة المتطلبات السابقة")
+    parser.add_argument("--pass-rate", type=float, default=0.7, help="نسبة اجتياز المقررات التي حاولها الطالب")
+    parser.add_argument("--max-hours", type=float, default=20, help="الحد الأقصى للساعات لكل طالب")
+    parser.add_argument("--reference-max", type=int, default=1000, help="أكبر دفعة تُشغّل عليها النسخة المرجعية البطيئة")
+    parser.add_argument("--optimal", action="store_true", help="قياس وضع التحسين مع السعات أيضاً")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="حفظ النتائج في ملف CSV")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = run(args)
+    print(results.to_string(index=False, float_format=lambda v: f"{v:,.3f}"))
+    if args.output:
+        results.to_csv(args.output, index=False)
+    mismatches = results[results['matches'].apply(lambda v: v is False)]
+    if not mismatches.empty:
+        print("مخرجات غير متطابقة:", ", ".join(f"{r.engine}@{r.students}" for r in mismatches.itertuples()), file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+"""
+الحالة المضغوطة لجلسة استبيان هولاند (HandV3.py و mainAR.py).
+
+بدلاً من تخزين نصوص الأسئلة والأنشطة ونسخ من الجداول في st.session_state، تُخزن الجلسة
+أرقام صفوف في البنوك المشتركة (question_bank) ومصفوفات NumPy صغيرة فقط:
+    question_rows      int16[n_questions]   أرقام صفوف الأسئلة بترتيب العرض
+    responses          int8[n_questions]    رقم خيار الإجابة (RESPONSE_UNANSWERED قبل الإجابة)
+    activity_rows      int16[n_activities]  أرقام صفوف الأنشطة المعروضة
+    activity_selected  bool[n_activities]
+    subject_selected   bool[n_subjects]
+    scores             int16[6]             نقاط الفئات الست بترتيب CATEGORIES
+تُسجّل الإجابات والاختيارات عبر riasec_scoring.RiasecScorer (record_response و record_activity
+و record_subject)، فتُحدّث scores بفرق نقاط العنصر المتغير فقط بدلاً من إعادة حسابها عند كل عرض.
+أرقام الصفوف int16، لذلك لا يتجاوز البنك MAX_BANK_ROWS صفاً (يُتحقق من ذلك عند تحميله).
+
+الحد الأعلى لحجم الجلسة: MAX_SESSION_BYTES (انظر session_nbytes) عند عدم تجاوز الحدود
+MAX_QUESTIONS و MAX_ACTIVITIES و MAX_SUBJECTS. لعرض تقرير الذاكرة:
+    python compact_session.py
+"""
+import sys
+
+import numpy as np
+
+RESPONSE_UNANSWERED = -1
+ROW_DTYPE = np.int16
+MAX_BANK_ROWS = int(np.iinfo(ROW_DTYPE).max) + 1
+N_CATEGORIES = 6
+
+MAX_QUESTIONS = 128
+MAX_ACTIVITIES = 64
+MAX_SUBJECTS = 64
+MAX_SESSION_BYTES = 1536
+
+
+class CompactSession:
+    __slots__ = ("question_rows", "responses", "activity_rows", "activity_selected", "subject_selected", "scores")
+
+    def __init__(self, question_rows, activity_rows=(), n_subjects=0):
+        if len(question_rows) > MAX_QUESTIONS or len(activity_rows) > MAX_ACTIVITIES or n_subjects > MAX_SUBJECTS:
+            raise ValueError("حجم الجلسة يتجاوز الحدود MAX_QUESTIONS / MAX_ACTIVITIES / MAX_SUBJECTS")
+        self.question_rows = np.asarray(question_rows, dtype=ROW_DTYPE)
+        self.responses = np.full(len(self.question_rows), RESPONSE_UNANSWERED, dtype=np.int8)
+        self.activity_rows = np.zeros(0, dtype=ROW_DTYPE)
+        self.activity_selected = np.zeros(0, dtype=bool)
+        self.subject_selected = np.zeros(n_subjects, dtype=bool)
+        self.scores = np.zeros(N_CATEGORIES, dtype=np.int16)
+        self.set_activities(activity_rows)
+
+    def set_activities(self, activity_rows):
+        """الأنشطة المعروضة (قبل أي اختيار منها، حتى تبقى scores متوافقة مع الاختيارات)."""
+        if len(activity_rows) > MAX_ACTIVITIES:
+            raise ValueError("عدد الأنشطة يتجاوز MAX_ACTIVITIES")
+        if self.activity_selected.any():
+            raise ValueError("لا يمكن تغيير الأنشطة بعد اختيار بعضها")
+        self.activity_rows = np.asarray(activity_rows, dtype=ROW_DTYPE)
+        self.activity_selected = np.zeros(len(self.activity_rows), dtype=bool)
+
+    def selected_activity_rows(self):
+        return self.activity_rows[self.activity_selected].tolist()
+
+
+def session_nbytes(session):
+    """الحجم الفعلي للجلسة بالبايت: الكائن نفسه مع جميع مصفوفاته."""
+    return sys.getsizeof(session) + sum(sys.getsizeof(getattr(session, name)) for name in CompactSession.__slots__)
+
+
+def deep_nbytes(obj, seen=None):
+    """تقدير الحجم العميق لكائنات بايثون (للمقارنة مع التمثيل القديم في التقرير)."""
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    if hasattr(obj, "memory_usage") and hasattr(obj, "columns"):
+        return int(obj.memory_usage(deep=True).sum())
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_nbytes(k, seen) + deep_nbytes(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set)):
+        size += sum(deep_nbytes(item, seen) for item in obj)
+    return size
+
+
+def memory_report():
+    """يطبع حجم الجلسة لكل تطبيق بالتمثيل المضغوط مقارنة بالتمثيل السابق."""
+    from question_bank import CATEGORIES, load_bank
+
+    questions = load_bank("questions_dict.csv", "Question")
+    activities = load_bank("activities.csv", "Activity")
+    subjects = load_bank("subject_category_mapping.csv", "Subject")
+    rng = np.random.default_rng(0)
+
+    # HandV3: 10 أسئلة و 2 نشاط لكل فئة وجميع المواد
+    question_rows = questions.sample_rows(10, rng)
+    activity_rows = activities.sample_rows(2, rng)
+    handv3 = CompactSession(question_rows, activity_rows, len(subjects.unique_texts))
+    handv3.responses[:] = rng.integers(0, 5, len(question_rows))
+    handv3_legacy = {
+        "questions": questions.frame.iloc[question_rows].reset_index(drop=True),
+        "sampled_activities": activities.frame.iloc[activity_rows].reset_index(drop=True),
+        "responses": {f"response_{i}": "أوافق بشدة" for i in range(len(question_rows))},
+        "selected_activities": [activities.texts[row] for row in activity_rows[:6]],
+        "selected_subjects": [text for text, _ in subjects.unique_texts[:5]],
+        "scores": dict.fromkeys(CATEGORIES, 0),
+    }
+
+    # mainAR: 10 أسئلة لكل فئة بترتيب عشوائي، وجميع الأنشطة، و 9 مواد
+    question_rows = rng.permutation(questions.sample_rows(10, rng)).tolist()
+    main_ar = CompactSession(question_rows, range(len(activities)), 9)
+    main_ar.responses[:] = rng.integers(0, 5, len(question_rows))
+    selected = [{"question": questions.texts[row], "category": questions.categories[row]} for row in question_rows]
+    main_ar_legacy = {
+        "selected_questions": selected,
+        "shuffled_questions": list(selected),
+        "answers": ["5 - أوافق بشدة"] * len(question_rows),
+        "scores": dict.fromkeys(CATEGORIES, 0),
+        "checkbox_states": {f"{category}_{i}": False for category in CATEGORIES for i in range(6)},
+        "subject_states": {f"subject_{i}": False for i in range(9)},
+    }
+
+    print(f"{'التطبيق':<10} {'مضغوط (بايت)':>14} {'سابقاً (بايت)':>14}")
+    for name, compact, legacy in [("HandV3", handv3, handv3_legacy), ("mainAR", main_ar, main_ar_legacy)]:
+        compact_bytes = session_nbytes(compact)
+        print(f"{name:<10} {compact_bytes:>14,} {deep_nbytes(legacy):>14,}")
+
+    largest = CompactSession(np.zeros(MAX_QUESTIONS), np.zeros(MAX_ACTIVITIES), MAX_SUBJECTS)
+    print(f"الحد الأعلى: {session_nbytes(largest):,} بايت (MAX_SESSION_BYTES = {MAX_SESSION_BYTES:,})")
+    assert session_nbytes(largest) <= MAX_SESSION_BYTES
+
+
+if __name__ == "__main__":
+    memory_report()
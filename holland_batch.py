@@ -0,0 +1,307 @@
+"""
+تسجيل نقاط استبيانات هولاند دفعة واحدة بدون Streamlit (للمسح على مستوى المدرسة).
+
+صيغة ورقة الإجابات (CSV أو Parquet) صف لكل طالب:
+    ID                      رقم الطالب (يمكن تغيير اسم العمود عبر --id-column)
+    <نص السؤال>             رقم خيار الإجابة من 1 ("لا أوافق بشدة") إلى 5 ("أوافق بشدة")، فارغ = لم يُجب
+    <نص النشاط>             1 إذا اختاره الطالب، وإلا 0 أو فارغ
+    <اسم المادة>            1 إذا اختارها الطالب، وإلا 0 أو فارغ
+أسماء الأعمدة هي النصوص كما في البنوك (questions_dict.csv و activities.csv و subject_category_mapping.csv)،
+ويمكن إنشاء ورقة فارغة بجميع الأعمدة عبر --template.
+
+أمثلة:
+    python holland_batch.py --template answers_template.csv
+    python holland_batch.py --input answers.csv --output scores.csv
+    python holland_batch.py --input sheets/ --output scores.parquet --format parquet --workers 8
+
+يُقرأ المدخل على دفعات (--chunk-size صف) وتُسجّل كل دفعة في عملية مستقلة بضرب مصفوفات واحد
+(riasec_scoring)، ثم تُكتب النتائج بالترتيب في ملف واحد: ID و Source ونقاط الفئات الست و
+Code (أعلى فئتين كما في HandV3.py) و Code3 (أعلى ثلاث فئات) و Majors (التخصصات المقترحة من USOC للكود).
+"""
+import argparse
+import csv
+import glob
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from question_bank import load_bank
+from riasec_scoring import RiasecScorer, holland_codes
+from usoc_index import MAJORS_SEPARATOR, USOCIndex, load_usoc_table
+
+CHUNK_SIZE = 20000  # عدد الطلاب في كل دفعة
+RESPONSE_POINTS = [0, 1, 2, 3, 4]  # نقاط الخيارات 1..5 كما في HandV3.py
+
+# حالة كل عملية تسجيل (تُهيّأ مرة واحدة عبر init_worker)
+_scorer = None
+_banks = None
+_usoc_index = None
+_majors_cache = {}
+
+
+def load_scoring_banks(questions_path, activities_path, subjects_path):
+    questions = load_bank(questions_path, "Question")
+    activities = load_bank(activities_path, "Activity")
+    subjects = load_bank(subjects_path, "Subject")
+    return questions, activities, subjects
+
+
+def build_scorer(banks, response_points):
+    questions, activities, subjects = banks
+    subject_categories = [subjects.text_categories(subject) for subject, _ in subjects.unique_texts]
+    return RiasecScorer.from_banks(response_points, questions, activities, subject_categories)
+
+
+def init_worker(bank_paths, usoc_path, response_points):
+    global _scorer, _banks, _usoc_index
+    _banks = load_scoring_banks(*bank_paths)
+    _scorer = build_scorer(_banks, response_points)
+    _usoc_index = None
+    if usoc_path and os.path.exists(usoc_path):
+        _usoc_index = USOCIndex(load_usoc_table(usoc_path))
+    _majors_cache.clear()
+
+
+def template_columns(banks, id_column="ID"):
+    questions, activities, subjects = banks
+    return (
+        [id_column]
+        + [text for text, _ in questions.unique_texts]
+        + [text for text, _ in activities.unique_texts]
+        + [text for text, _ in subjects.unique_texts]
+    )
+
+
+def map_columns(columns, banks, scorer):
+    """
+    يربط أعمدة ورقة الإجابات بمواضعها في متجه العناصر:
+    يعيد (أعمدة الأسئلة، مواضعها)، (أعمدة الأنشطة والمواد، مواضعها)، والأعمدة غير المعروفة.
+    """
+    questions, activities, subjects = banks
+    subject_index = {text: idx for idx, (text, _) in enumerate(subjects.unique_texts)}
+    question_columns, question_items = [], []
+    choice_columns, choice_items = [], []
+    unknown = []
+    for column in columns:
+        if column in questions.text_rows:
+            question_columns.append(column)
+            question_items.append(int(questions.text_rows[column][0]))
+        elif column in activities.text_rows:
+            choice_columns.append(column)
+            choice_items.append(scorer.n_questions + int(activities.text_rows[column][0]))
+        elif column in subject_index:
+            choice_columns.append(column)
+            choice_items.append(scorer.n_questions + scorer.n_activities + subject_index[column])
+        else:
+            unknown.append(column)
+    return (question_columns, question_items), (choice_columns, choice_items), unknown
+
+
+def suggested_majors(code):
+    majors = _majors_cache.get(code)
+    if majors is None:
+        majors = MAJORS_SEPARATOR.join(_usoc_index.suggested_fields(code)) if _usoc_index is not None else ""
+        _majors_cache[code] = majors
+    return majors
+
+
+def numeric_values(chunk, columns):
+    """قيم الأعمدة كأرقام عشرية (القيم غير الرقمية تصبح NaN)؛ لا تُحوّل إلا الأعمدة النصية."""
+    values = chunk[columns]
+    text_columns = [column for column in columns if not pd.api.types.is_numeric_dtype(values[column])]
+    if text_columns:
+        values = values.copy()
+        values[text_columns] = values[text_columns].apply(pd.to_numeric, errors="coerce")
+    return values.to_numpy(dtype=float)
+
+
+def score_chunk(chunk, id_column, source):
+    """تسجيل دفعة من أوراق الإجابات (يُنفّذ داخل عملية تسجيل). يعيد (جدول النتائج، عدد الإجابات غير الصالحة)."""
+    if id_column not in chunk.columns:
+        raise ValueError(f"{source}: العمود {id_column} غير موجود")
+    (question_columns, question_items), (choice_columns, choice_items), _ = map_columns(chunk.columns, _banks, _scorer)
+
+    items = np.zeros((len(chunk), _scorer.n_items), dtype=np.int16)
+    invalid = 0
+    if question_columns:
+        answers = numeric_values(chunk, question_columns)
+        n_options = len(_scorer.response_points) - 1
+        valid = (answers >= 1) & (answers <= n_options) & (answers == np.round(answers))
+        invalid = int((~valid & ~np.isnan(answers)).sum())
+        # الخيار k يقابل الفهرس k-1، والإجابة غير الصالحة أو الفارغة تقابل -1 (بدون نقاط)
+        option_index = np.where(valid, np.nan_to_num(answers) - 1, -1).astype(np.int64)
+        items[:, question_items] = _scorer.response_points[option_index]
+    if choice_columns:
+        items[:, choice_items] = numeric_values(chunk, choice_columns) > 0
+
+    scores = _scorer.score_batch(items)
+    codes = holland_codes(scores, 2)
+    result = pd.DataFrame(scores, columns=list(_scorer.categories))
+    result.insert(0, "Source", source)
+    result.insert(0, "ID", chunk[id_column].astype(str).to_numpy())
+    result["Code"] = codes
+    result["Code3"] = holland_codes(scores, 3)
+    result["Majors"] = [suggested_majors(code) for code in codes]
+    return result, invalid
+
+
+def result_schema(categories):
+    """أعمدة ملف النتائج وأنواعها، ثابتة لجميع الدفعات (حتى الفارغة منها)."""
+    import pyarrow as pa
+
+    return pa.schema(
+        [("ID", pa.string()), ("Source", pa.string())]
+        + [(category, pa.int32()) for category in categories]
+        + [("Code", pa.string()), ("Code3", pa.string()), ("Majors", pa.string())]
+    )
+
+
+def find_inputs(path):
+    """ملف واحد أو جميع ملفات CSV و Parquet في المجلد (بترتيب الأسماء)."""
+    if os.path.isdir(path):
+        return sorted(glob.glob(os.path.join(path, "*.csv")) + glob.glob(os.path.join(path, "*.parquet")))
+    return [path]
+
+
+def iter_chunks(path, chunk_size, id_column="ID"):
+    """قراءة الملف على دفعات من الصفوف بدون تحميله كاملاً في الذاكرة."""
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+        return
+    yield from pd.read_csv(path, chunksize=chunk_size, dtype={id_column: str}, encoding="utf-8-sig")
+
+
+class ResultWriter:
+    """
+    كتابة النتائج في ملف واحد على دفعات (CSV أو Parquet) بالأعمدة المعرّفة في schema.
+    الدفعات الفارغة (مثل ورقة --template بدون صفوف) لا تُكتب، ويُنشأ الملف بالأعمدة فقط إن لم يكن فيه أي صف.
+    """
+
+    def __init__(self, path, output_format, schema):
+        self.path = path
+        self.output_format = output_format
+        self.schema = schema
+        self._parquet = None
+        self._file = None
+
+    def _open(self):
+        if self.output_format == "parquet":
+            import pyarrow.parquet as pq
+
+            self._parquet = pq.ParquetWriter(self.path, self.schema)
+        else:
+            self._file = open(self.path, mode='w', newline='', encoding='utf-8-sig')
+            pd.DataFrame(columns=self.schema.names).to_csv(self._file, index=False)
+
+    def write(self, frame):
+        if frame.empty:
+            return
+        if self._parquet is None and self._file is None:
+            self._open()
+        if self.output_format == "parquet":
+            import pyarrow as pa
+
+            self._parquet.write_table(pa.Table.from_pandas(frame, schema=self.schema, preserve_index=False))
+            return
+        frame.to_csv(self._file, index=False, header=False, quoting=csv.QUOTE_MINIMAL)
+
+    def close(self):
+        if self._parquet is None and self._file is None:
+            self._open()
+        if self._parquet is not None:
+            self._parquet.close()
+        if self._file is not None:
+            self._file.close()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="تسجيل نقاط أوراق إجابات استبيان هولاند دفعة واحدة بدون واجهة Streamlit.")
+    action = parser.add_mutually_exclusive_group(required=True)
+    action.add_argument("--input", help="ملف CSV/Parquet لأوراق الإجابات أو مجلد يحتوي عدة ملفات")
+    action.add_argument("--template", help="إنشاء ورقة إجابات فارغة بجميع الأعمدة في هذا الملف والخروج")
+    parser.add_argument("--output", help="ملف النتائج الموحد")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv", help="صيغة ملف النتائج")
+    parser.add_argument("--id-column", default="ID", help="اسم عمود رقم الطالب")
+    parser.add_argument("--points", default=",".join(map(str, RESPONSE_POINTS)),
+                        help="نقاط خيارات الإجابة 1..n مفصولة بفواصل (افتراضياً كما في HandV3.py)")
+    parser.add_argument("--questions", default="questions_dict.csv", help="بنك الأسئلة")
+    parser.add_argument("--activities", default="activities.csv", help="بنك الأنشطة")
+    parser.add_argument("--subjects", default="subject_category_mapping.csv", help="بنك المواد الدراسية")
+    parser.add_argument("--usoc", default="USOC.xlsx", help="ملف المهن لاقتراح التخصصات (يُتجاهل إن لم يوجد)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="عدد الطلاب في كل دفعة")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="عدد العمليات المتوازية")
+    args = parser.parse_args(argv)
+    if args.input and not args.output:
+        parser.error("--output مطلوب عند استخدام --input")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    bank_paths = (args.questions, args.activities, args.subjects)
+    banks = load_scoring_banks(*bank_paths)
+
+    if args.template:
+        pd.DataFrame(columns=template_columns(banks, args.id_column)).to_csv(args.template, index=False, encoding="utf-8-sig")
+        print(f"تم إنشاء ورقة الإجابات الفارغة: {args.template}")
+        return 0
+
+    paths = find_inputs(args.input)
+    if not paths:
+        print(f"لا توجد ملفات CSV أو Parquet في {args.input}", file=sys.stderr)
+        return 1
+    response_points = [int(value) for value in args.points.split(",")]
+    scorer = build_scorer(banks, response_points)
+
+    start = time.perf_counter()
+    total_students = 0
+    total_invalid = 0
+    writer = ResultWriter(args.output, args.format, result_schema(scorer.categories))
+    workers = max(1, args.workers)
+    pending = deque()
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                 initargs=(bank_paths, args.usoc, response_points)) as pool:
+            for path in paths:
+                source = os.path.basename(path)
+                unknown_reported = False
+                for chunk in iter_chunks(path, args.chunk_size, args.id_column):
+                    if not unknown_reported:
+                        unknown = map_columns(chunk.columns, banks, scorer)[2]
+                        unknown = [column for column in unknown if column != args.id_column]
+                        if unknown:
+                            print(f"[{source}] أعمدة غير معروفة تم تجاهلها: {', '.join(map(str, unknown))}", file=sys.stderr)
+                        unknown_reported = True
+                    pending.append(pool.submit(score_chunk, chunk, args.id_column, source))
+                    # عدد محدود من الدفعات قيد المعالجة حتى يبقى استهلاك الذاكرة ثابتاً مهما كان حجم المدخل
+                    while len(pending) >= 2 * workers:
+                        result, invalid = pending.popleft().result()
+                        writer.write(result)
+                        total_students += len(result)
+                        total_invalid += invalid
+            while pending:
+                result, invalid = pending.popleft().result()
+                writer.write(result)
+                total_students += len(result)
+                total_invalid += invalid
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - start
+    rate = total_students / elapsed if elapsed > 0 else float("inf")
+    print(f"الإجمالي: {total_students} طالب من {len(paths)} ملف في {elapsed:.2f} ثانية ({rate:,.0f} صف/ثانية)")
+    if total_invalid:
+        print(f"تم تجاهل {total_invalid} إجابة غير صالحة (خارج النطاق 1..{len(response_points)})", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,198 @@
+"""
+Streaming analysis of live microphone audio (the WebRTC tab in mainAR.py).
+
+StreamingAnalyzer receives the audio in small frames as it arrives (push / push_frame) and
+keeps two fixed-size structures per session, so memory does not grow with speaking time:
+
+    ring buffer   the last MAX_SECONDS of mono 16-bit PCM, preallocated, used only to
+                  transcribe the recording when the student asks for the analysis
+    running stats updated for every block of BLOCK_HOPS hops as soon as it is complete:
+                  RMS and zero crossing sums, voiced F0 sum / sum of squares (vectorized
+                  YIN from pitch.py), pause detection, and an onset-strength envelope
+                  (itself a bounded ring) for the speech tempo
+
+features() therefore only combines the counters (plus a tempo estimate from the short
+onset envelope) and returns immediately however long the student talked.
+"""
+import threading
+
+import numpy as np
+import scipy.fft
+
+from audio_io import Recording
+from pitch import SPEECH_F0_MAX, SPEECH_F0_MIN, yin_frame_length, yin_frames
+
+MAX_SECONDS = 120  # audio kept for transcription; older audio is overwritten
+BLOCK_HOPS = 8  # hops analysed together (vectorized) once they are complete
+SILENCE_DB = 20  # frames this far below the loudest frame so far count as silence
+SILENCE_FLOOR = 0.003  # RMS under which a frame is always silence
+MIN_PAUSE = 0.3  # seconds of silence counted as a pause
+
+
+def warm_up():
+    """Load librosa's tempo code (lazy imports and numba compilation take seconds on the first call)."""
+    analyzer = StreamingAnalyzer(max_seconds=2)
+    t = np.arange(16000) / 16000
+    analyzer.push((0.3 * np.sin(2 * np.pi * 150 * t)).astype(np.float32), 16000)
+    analyzer.features()
+
+
+def frame_to_mono(frame):
+    """(float32 mono samples in [-1, 1), sample rate) of a PyAV AudioFrame (packed or planar)."""
+    samples = frame.to_ndarray()
+    scale = 32768 if np.issubdtype(samples.dtype, np.integer) else 1
+    if frame.format.is_planar:
+        samples = samples.mean(axis=0, dtype=np.float32)
+    else:
+        samples = samples.reshape(-1, len(frame.layout.channels)).mean(axis=1, dtype=np.float32)
+    return samples / scale, frame.sample_rate
+
+
+class StreamingAnalyzer:
+    """One per live session; push() and features() may be called from different threads."""
+
+    def __init__(self, max_seconds=MAX_SECONDS):
+        self.max_seconds = max_seconds
+        self.sr = None
+        self._lock = threading.Lock()
+
+    def _start(self, sr):
+        """Allocate the buffers once the sample rate of the stream is known."""
+        self.sr = sr
+        self.frame_length = yin_frame_length(sr)
+        self.hop_length = self.frame_length // 2
+        self.ring = np.zeros(int(self.max_seconds * sr), dtype=np.int16)
+        self.onsets = np.zeros(int(self.max_seconds * sr) // self.hop_length, dtype=np.float32)
+        self.window = np.hanning(self.frame_length).astype(np.float32)
+        # samples still waiting for a complete block, with frame_length - hop_length of overlap in front
+        overlap = self.frame_length - self.hop_length
+        self._pending = np.zeros(overlap + BLOCK_HOPS * self.hop_length, dtype=np.float32)
+        self._n_pending = overlap
+        self._previous_spectrum = None
+        self.samples = 0
+        self.frames = 0
+        self.rms_sum = 0.0
+        self.zcr_sum = 0.0
+        self.max_rms = 0.0
+        self.voiced_frames = 0
+        self.f0_sum = 0.0
+        self.f0_squared_sum = 0.0
+        self.speech_frames = 0
+        self.speech_segments = 0
+        self.pauses = 0
+        self.pause_frames = 0
+        self._silent_run = 0
+
+    def push_frame(self, frame):
+        """Add a PyAV AudioFrame (e.g. from streamlit-webrtc's recv)."""
+        self.push(*frame_to_mono(frame))
+
+    def push(self, samples, sr):
+        """Add mono float samples; every completed block is analysed right away."""
+        with self._lock:
+            if self.sr is None:
+                self._start(sr)
+            elif sr != self.sr:
+                raise ValueError(f"sample rate changed from {self.sr} to {sr} Hz mid-stream")
+            self._write_ring(samples)
+            while len(samples):
+                taken = min(len(samples), len(self._pending) - self._n_pending)
+                self._pending[self._n_pending:self._n_pending + taken] = samples[:taken]
+                self._n_pending += taken
+                samples = samples[taken:]
+                if self._n_pending == len(self._pending):
+                    self._analyse_block(self._pending)
+                    overlap = self.frame_length - self.hop_length
+                    self._pending[:overlap] = self._pending[-overlap:]
+                    self._n_pending = overlap
+
+    def _write_ring(self, samples):
+        pcm = np.clip(np.rint(samples[-len(self.ring):] * 32767), -32768, 32767).astype(np.int16)
+        start = (self.samples + len(samples) - len(pcm)) % len(self.ring)
+        first = min(len(pcm), len(self.ring) - start)
+        self.ring[start:start + first] = pcm[:first]
+        self.ring[:len(pcm) - first] = pcm[first:]
+        self.samples += len(samples)
+
+    def _analyse_block(self, block):
+        frames = np.lib.stride_tricks.sliding_window_view(block, self.frame_length)[::self.hop_length]
+
+        rms = np.sqrt(np.mean(frames ** 2, axis=1))
+        signs = np.signbit(frames)
+        zcr = np.mean(signs[:, 1:] != signs[:, :-1], axis=1)
+        self.frames += len(frames)
+        self.rms_sum += float(rms.sum())
+        self.zcr_sum += float(zcr.sum())
+
+        f0 = yin_frames(frames.astype(np.float64), self.sr, SPEECH_F0_MIN, SPEECH_F0_MAX)
+        voiced = f0[~np.isnan(f0)]
+        self.voiced_frames += len(voiced)
+        self.f0_sum += float(voiced.sum())
+        self.f0_squared_sum += float((voiced ** 2).sum())
+
+        # onset strength: positive log-spectral flux between consecutive frames
+        spectrum = np.log1p(100 * np.abs(scipy.fft.rfft(frames * self.window, axis=1)))
+        previous = spectrum[:1] if self._previous_spectrum is None else self._previous_spectrum
+        flux = np.maximum(np.diff(np.vstack([previous, spectrum]), axis=0), 0).mean(axis=1)
+        self._previous_spectrum = spectrum[-1:]
+        first = self.frames - len(frames)
+        self.onsets[np.arange(first, self.frames) % len(self.onsets)] = flux
+
+        # pauses: runs of silent frames of at least MIN_PAUSE seconds
+        self.max_rms = max(self.max_rms, float(rms.max()))
+        threshold = max(SILENCE_FLOOR, self.max_rms * 10 ** (-SILENCE_DB / 20))
+        # (silence before the first and after the last speech frame is not a pause)
+        min_pause_frames = MIN_PAUSE * self.sr / self.hop_length
+        for silent in rms < threshold:
+            if silent:
+                self._silent_run += 1
+                continue
+            if self.speech_frames == 0:
+                self.speech_segments = 1
+            elif self._silent_run >= min_pause_frames:
+                self.speech_segments += 1
+                self.pauses += 1
+                self.pause_frames += self._silent_run
+            self._silent_run = 0
+            self.speech_frames += 1
+
+    def _tempo(self):
+        import librosa
+
+        n = min(self.frames, len(self.onsets))
+        if n < 2:
+            return 0.0
+        start = (self.frames - n) % len(self.onsets)
+        envelope = np.roll(self.onsets, -start)[:n]
+        return float(librosa.feature.tempo(onset_envelope=envelope, sr=self.sr, hop_length=self.hop_length)[0])
+
+    def features(self):
+        """Feature record of everything analysed so far (None before the first complete block)."""
+        with self._lock:
+            if not self.frames:
+                return None
+            hop_seconds = self.hop_length / self.sr
+            speech_seconds = self.speech_frames * hop_seconds
+            f0_mean = self.f0_sum / self.voiced_frames if self.voiced_frames else float("nan")
+            f0_variance = self.f0_squared_sum / self.voiced_frames - f0_mean ** 2 if self.voiced_frames else float("nan")
+            return {
+                "tempo": self._tempo(),  # speech speed
+                "energy": self.rms_sum / self.frames,  # loudness
+                "pitch": f0_mean,  # average pitch of voiced frames
+                "pitch_std": float(np.sqrt(max(f0_variance, 0.0))) if self.voiced_frames else float("nan"),
+                "zcr": self.zcr_sum / self.frames,
+                "voiced_ratio": self.voiced_frames / self.frames,
+                "speech_rate": self.speech_segments / speech_seconds if speech_seconds else 0.0,
+                "pause_count": self.pauses,
+                "pause_duration": self.pause_frames * hop_seconds / self.pauses if self.pauses else 0.0,
+                "duration": self.samples / self.sr,
+            }
+
+    def recording(self):
+        """The last max_seconds of audio as an audio_io.Recording (for speech recognition)."""
+        with self._lock:
+            if self.sr is None:
+                return None
+            n = min(self.samples, len(self.ring))
+            start = (self.samples - n) % len(self.ring)
+            return Recording(np.roll(self.ring, -start)[:n], self.sr)
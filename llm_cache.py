@@ -0,0 +1,105 @@
+"""
+تخزين دائم لردود نموذج اللغة (مثل نص الإرشاد في HandV3.py).
+
+تُحفظ الردود في ملف SQLite محلي بمفتاح هو بصمة مدخلات الطلب بعد توحيدها (normalize)،
+فيشترك الطلاب الذين لهم نفس الرمز والأنشطة والمواد والتخصصات في رد واحد بدلاً من
+استدعاء جديد للواجهة عند كل ضغطة أو إعادة تشغيل للصفحة.
+
+- TTL: الردود الأقدم من ttl ثانية تُعامل كغير موجودة وتُحذف عند الكتابة.
+- LRU: عند تجاوز max_entries ردّاً يُحذف الأقدم قراءةً.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import unicodedata
+
+DEFAULT_PATH = "llm_cache.db"
+DEFAULT_TTL = 7 * 24 * 3600  # أسبوع
+DEFAULT_MAX_ENTRIES = 10000
+BUSY_TIMEOUT = 30
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses (last_access);
+"""
+
+
+def normalize(value):
+    """
+    الصيغة الموحدة لمدخلات الطلب: النصوص بتطبيع NFKC ومسافات مفردة، والقوائم والمجموعات
+    مرتبة حتى لا يغير ترتيب اختيار الطالب للعناصر المفتاح.
+    """
+    if isinstance(value, str):
+        return " ".join(unicodedata.normalize("NFKC", value).split())
+    if isinstance(value, dict):
+        return {str(k): normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sorted((normalize(item) for item in value), key=lambda item: json.dumps(item, ensure_ascii=False))
+    return value
+
+
+def cache_key(**inputs):
+    """بصمة SHA-256 للمدخلات الموحدة (تُضمّن معها اسم النموذج ومعاملات التوليد)."""
+    payload = json.dumps(normalize(inputs), ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """مخزن ردود مشترك بين جميع جلسات التطبيق، آمن مع عدة خيوط وعدة عمليات (SQLite WAL)."""
+
+    def __init__(self, path=DEFAULT_PATH, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, timeout=BUSY_TIMEOUT, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript(SCHEMA)
+
+    def get(self, key):
+        """الرد المخزن للمفتاح، أو None إذا لم يوجد أو انتهت صلاحيته."""
+        now = time.time()
+        with self._lock, self._connection:
+            row = self._connection.execute(
+                "SELECT value FROM responses WHERE key = ? AND created_at >= ?", (key, now - self.ttl)
+            ).fetchone()
+            if row is None:
+                return None
+            self._connection.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+        return row[0]
+
+    def put(self, key, value):
+        now = time.time()
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            self._connection.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl,))
+            (count,) = self._connection.execute("SELECT COUNT(*) FROM responses").fetchone()
+            if count > self.max_entries:
+                self._connection.execute(
+                    "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY last_access LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+
+    def get_or_create(self, key, create):
+        """إرجاع الرد المخزن، أو استدعاء create() وتخزين نتيجتها (إذا لم تكن فارغة)."""
+        value = self.get(key)
+        if value is None:
+            value = create()
+            if value:
+                self.put(key, value)
+        return value
+
+    def __len__(self):
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
@@ -0,0 +1,362 @@
+"""
+عميل مشترك لاستدعاءات نموذج المحادثة مع بث الرد (الإرشاد في HandV3.py، وتحليل الشخصية في
+HandSpeech.py، وتقرير الاختبار في ELMAI.py و ELMAIV2_Offline.py).
+
+يُعرض النص في placeholder في Streamlit أثناء وصوله بدلاً من الانتظار حتى يكتمل الرد. يُسجَّل
+لكل استدعاء زمن أول جزء (TTFT) والزمن الكلي في LLMClient.metrics، ويمكن إضافتها إلى ملف JSON-lines.
+
+النموذج خلف العميل قابل للاستبدال (backend):
+    OpenAIBackend        واجهة chat-completions عبر openai==0.28
+                         (يمكن توجيهها إلى llm_stub_server.py عبر api_base للاختبار)
+    TransformersBackend  نموذج توليد نصوص محلي من transformers (مثل GPT-J) يُحمّل عند أول استخدام
+    StubBackend          ردود ثابتة داخل العملية، بدون شبكة أو نموذج
+
+حتى لا يحجز مزود بطيء جميع خيوط Streamlit: لكل استدعاء مهلة لكل قراءة وحد أقصى للمدة الكلية،
+ويُعاد الاستدعاء الفاشل عدداً محدوداً من المرات بتأخير أسي عشوائي (فقط قبل عرض أي نص)، ويرفض
+قاطع الدائرة (CircuitBreaker) الاستدعاءات فوراً لمدة reset_timeout ثانية بعد failure_threshold
+استدعاءات فاشلة متتالية.
+
+    python llm_stub_server.py --port 8765
+    LLMClient(OpenAIBackend(api_key="test", api_base="http://127.0.0.1:8765/v1"))
+"""
+import json
+import os
+import queue
+import random
+import statistics
+import threading
+import time
+from collections import deque
+
+DEFAULT_MODEL = "gpt-4o-mini"
+DEFAULT_LOCAL_MODEL = "EleutherAI/gpt-j-6B"
+DEFAULT_METRICS_PATH = "llm_metrics.jsonl"
+DEFAULT_TIMEOUT = 20  # ثوانٍ لانتظار الجزء الأول أو التالي
+DEFAULT_MAX_DURATION = 120  # ثوانٍ للرد كاملاً
+DEFAULT_MAX_RETRIES = 2
+DEFAULT_BACKOFF = 0.5  # ثوانٍ؛ المحاولة n تنتظر uniform(0, backoff * 2**n)
+RENDER_INTERVAL = 0.05  # ثوانٍ بين تحديثات placeholder أثناء البث
+CURSOR = "▌"
+
+
+class LLMError(Exception):
+    pass
+
+
+class LLMTimeoutError(LLMError):
+    pass
+
+
+class CircuitOpenError(LLMError):
+    pass
+
+
+class OpenAIBackend:
+    name = "openai"
+
+    def __init__(self, model=DEFAULT_MODEL, api_key=None, api_base=None):
+        self.model = model
+        self.api_key = api_key
+        self.api_base = api_base
+
+    def stream(self, messages, timeout, **params):
+        import openai
+
+        request = dict(model=self.model, messages=messages, stream=True, request_timeout=timeout, **params)
+        if self.api_key:
+            request["api_key"] = self.api_key
+        if self.api_base:
+            request["api_base"] = self.api_base
+        for chunk in openai.ChatCompletion.create(**request):
+            if chunk.choices:
+                delta = chunk.choices[0].delta.get("content")
+                if delta:
+                    yield delta
+
+    def is_retryable(self, error):
+        """يُعاد الطلب عند تجاوز حد الاستخدام أو انتهاء المهلة أو أخطاء الاتصال والخادم، ولا يُعاد عند خطأ الطلب أو المصادقة."""
+        import openai
+
+        return not isinstance(error, (
+            openai.error.AuthenticationError,
+            openai.error.PermissionError,
+            openai.error.InvalidRequestError,
+        ))
+
+
+class TransformersBackend:
+    name = "transformers"
+
+    def __init__(self, model=DEFAULT_LOCAL_MODEL, device=-1):
+        self.model = model
+        self.device = device  # -1 للمعالج، 0 لأول GPU
+        self._generator = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        with self._lock:
+            if self._generator is None:
+                from transformers import pipeline
+
+                self._generator = pipeline("text-generation", model=self.model, device=self.device)
+            return self._generator
+
+    def stream(self, messages, timeout, temperature=0.7, max_tokens=500, **params):
+        from transformers import TextIteratorStreamer
+
+        generator = self._load()
+        prompt = "\n".join(m["content"] for m in messages if m.get("role") != "system")
+        streamer = TextIteratorStreamer(generator.tokenizer, skip_prompt=True, skip_special_tokens=True, timeout=timeout)
+        # التوليد يعمل في خيط مستقل ويدفع النص المفكوك إلى streamer
+        threading.Thread(
+            target=generator,
+            args=(prompt,),
+            kwargs=dict(max_new_tokens=max_tokens, do_sample=True, temperature=temperature, streamer=streamer, **params),
+            daemon=True,
+        ).start()
+        try:
+            for text in streamer:
+                if text:
+                    yield text
+        except queue.Empty:
+            raise LLMTimeoutError(f"no output from {self.model} for {timeout}s")
+
+    def is_retryable(self, error):
+        return isinstance(error, LLMTimeoutError)
+
+
+class StubBackend:
+    name = "stub"
+
+    def __init__(self, model="stub", n_words=60, first_token_delay=0.0, token_delay=0.0):
+        self.model = model
+        self.n_words = n_words
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+
+    def stream(self, messages, timeout, **params):
+        from llm_stub_server import stub_reply
+
+        time.sleep(self.first_token_delay)
+        for i, word in enumerate(stub_reply(messages, self.n_words).split(" ")):
+            yield word if i == 0 else " " + word
+            time.sleep(self.token_delay)
+
+    def is_retryable(self, error):
+        return True
+
+
+BACKENDS = {backend.name: backend for backend in (OpenAIBackend, TransformersBackend, StubBackend)}
+
+
+def make_backend(name, **options):
+    if name not in BACKENDS:
+        raise ValueError(f"unknown LLM backend {name!r} (expected one of {sorted(BACKENDS)})")
+    return BACKENDS[name](**options)
+
+
+class CircuitBreaker:
+    """
+    مغلق (closed): تمر الاستدعاءات. بعد failure_threshold استدعاءات فاشلة متتالية (الأخطاء التي
+    يعتبرها الـ backend قابلة لإعادة المحاولة، أي المؤقتة أو من جهة الخادم) يُفتح ويرفض الاستدعاءات
+    لمدة reset_timeout ثانية، ثم يسمح باستدعاء تجريبي واحد (half-open): النجاح يغلقه، والفشل يعيد
+    فتحه، والاستدعاء التجريبي المتروك قبل أي منهما (release) يسمح للاستدعاء التالي بالمحاولة.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self.opened_at is None:
+                return "closed"
+            if time.monotonic() - self.opened_at >= self.reset_timeout:
+                return "half-open"
+            return "open"
+
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at >= self.reset_timeout and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def release(self):
+        """انتهى استدعاء مسموح به دون نتيجة (مثلاً أُغلق البث مبكراً)."""
+        with self._lock:
+            self._probing = False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+class LLMClient:
+    def __init__(
+        self,
+        backend,
+        timeout=DEFAULT_TIMEOUT,
+        max_duration=DEFAULT_MAX_DURATION,
+        max_retries=DEFAULT_MAX_RETRIES,
+        backoff=DEFAULT_BACKOFF,
+        breaker=None,
+        metrics_path=None,
+        max_metrics=1000,
+    ):
+        self.backend = backend
+        self.timeout = timeout
+        self.max_duration = max_duration
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.breaker = breaker or CircuitBreaker()
+        self.metrics_path = metrics_path
+        self.metrics = deque(maxlen=max_metrics)
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        return self.backend.model
+
+    @classmethod
+    def from_secrets(cls, secrets, backend=None, metrics_path=DEFAULT_METRICS_PATH, **backend_options):
+        """
+        عميل مُعدّ من القسم [openai] في st.secrets. الـ backend هو backend إن وُجد، وإلا متغير البيئة
+        LLM_BACKEND، وإلا secrets["backend"]، وإلا "openai"؛ مفاتيح اختيارية: model و api_base و
+        timeout و max_duration و max_retries.
+        """
+        name = backend or os.environ.get("LLM_BACKEND") or secrets.get("backend", "openai")
+        if "model" in secrets:
+            backend_options.setdefault("model", secrets["model"])
+        if name == "openai":
+            backend_options.setdefault("api_key", secrets.get("api_key"))
+            backend_options.setdefault("api_base", secrets.get("api_base"))
+        return cls(
+            make_backend(name, **backend_options),
+            timeout=float(secrets.get("timeout", DEFAULT_TIMEOUT)),
+            max_duration=float(secrets.get("max_duration", DEFAULT_MAX_DURATION)),
+            max_retries=int(secrets.get("max_retries", DEFAULT_MAX_RETRIES)),
+            metrics_path=metrics_path,
+        )
+
+    def stream(self, messages, **params):
+        """
+        يعيد أجزاء النص أثناء وصولها، وتُسجَّل المقاييس عند انتهاء البث.
+        يرفع CircuitOpenError دون استدعاء الـ backend ما دام قاطع الدائرة مفتوحاً.
+        """
+        start = time.perf_counter()
+        first_token = None
+        chunks = 0
+        chars = 0
+        attempts = 0
+        error = None
+        allowed = settled = False
+        try:
+            allowed = self.breaker.allow()
+            if not allowed:
+                raise CircuitOpenError(f"{self.backend.name} backend unavailable after repeated failures")
+            while True:
+                attempts += 1
+                try:
+                    for delta in self.backend.stream(messages, timeout=self.timeout, **params):
+                        if first_token is None:
+                            first_token = time.perf_counter() - start
+                        chunks += 1
+                        chars += len(delta)
+                        yield delta
+                        if time.perf_counter() - start > self.max_duration:
+                            raise LLMTimeoutError(f"answer took longer than {self.max_duration}s")
+                except Exception as e:
+                    transient = self.backend.is_retryable(e)
+                    # لا يمكن التراجع عن نص عُرض، لذلك لا تُعاد المحاولة إلا قبل الجزء الأول
+                    if chunks == 0 and attempts <= self.max_retries and transient:
+                        time.sleep(random.uniform(0, self.backoff * 2 ** attempts))
+                        continue
+                    # الأخطاء المؤقتة وأخطاء الخادم فقط تُحسب على الـ backend: مفتاح خاطئ أو طلب
+                    # واحد غير صالح يجب ألا يفتح قاطع الدائرة لجميع المستخدمين
+                    if transient:
+                        self.breaker.record_failure()
+                        settled = True
+                    raise
+                self.breaker.record_success()
+                settled = True
+                return
+        except BaseException as e:
+            # يشمل GeneratorExit عندما يتوقف القارئ مبكراً (مثل إعادة تشغيل صفحة Streamlit أو إيقافها)
+            error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            if allowed and not settled:
+                # وإلا بقي قاطع الدائرة في حالة half-open ينتظر نتيجة هذا الاستدعاء التجريبي للأبد
+                self.breaker.release()
+            self._record({
+                "backend": self.backend.name,
+                "model": self.model,
+                "ttft": first_token,
+                "total": time.perf_counter() - start,
+                "chunks": chunks,
+                "chars": chars,
+                "attempts": attempts,
+                "error": error,
+                "timestamp": time.time(),
+            })
+
+    def complete(self, messages, **params):
+        """نص الرد كاملاً (يُبث داخلياً حتى يُسجَّل TTFT أيضاً)."""
+        return "".join(self.stream(messages, **params)).strip()
+
+    def _record(self, metric):
+        with self._lock:
+            self.metrics.append(metric)
+            if self.metrics_path:
+                with open(self.metrics_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(metric) + "\n")
+
+    def summary(self):
+        """الوسيط والمئين 95 لزمن أول جزء (TTFT) والزمن الكلي للاستدعاءات المسجلة."""
+        with self._lock:
+            metrics = list(self.metrics)
+        succeeded = [m for m in metrics if m["error"] is None]
+        result = {"calls": len(metrics), "failed": len(metrics) - len(succeeded), "breaker": self.breaker.state}
+        for key in ("ttft", "total"):
+            values = sorted(m[key] for m in succeeded if m[key] is not None)
+            if values:
+                result[f"{key}_p50"] = statistics.median(values)
+                result[f"{key}_p95"] = values[min(len(values) - 1, int(0.95 * len(values)))]
+        return result
+
+
+def stream_to_placeholder(chunks, placeholder, render="markdown", interval=RENDER_INTERVAL):
+    """
+    يعرض النص المبثوث في placeholder في Streamlit (مثل st.empty()) بدالة العرض المحددة
+    ("markdown" أو "info" أو "write")، بتحديث كل interval ثانية على الأكثر، ويعيد النص كاملاً
+    عند انتهاء البث.
+    """
+    show = getattr(placeholder, render)
+    text = ""
+    last_render = 0.0
+    for delta in chunks:
+        text += delta
+        now = time.perf_counter()
+        if now - last_render >= interval:
+            show(text + CURSOR)
+            last_render = now
+    text = text.strip()
+    show(text)
+    return text
@@ -0,0 +1,209 @@
+"""
+مجموعة خيوط عاملة في الخلفية لتوليد ردود نموذج اللغة (تقرير الاختبار في ELMAI.py، والإرشاد في HandV3.py).
+
+تضيف الصفحة الطلب إلى الطابور وتحفظ رقمه في st.session_state؛ وعدد ثابت من الخيوط العاملة يسحب
+الطلبات من طابور FIFO محدود ويسجل أجزاء النص المبثوثة على الطلب. تعرض الصفحة ترتيب الطلب أثناء
+انتظاره (positions) ثم تبث أجزاءه في placeholder أثناء وصولها (follow، مثلاً عبر
+stream_to_placeholder)؛ وعند إعادة تشغيل الصفحة يُعاد عرض الطلب من أول جزء. بذلك لا يصل إلى
+الـ backend أكثر من workers استدعاءات متزامنة مهما كان عدد الطلاب الذين ينتهون معاً.
+
+الضغط العكسي: إذا كان max_pending طلباً في الانتظار يرفع submit() الخطأ QueueFullError (مع عدد
+المنتظرين) بدلاً من ترك الطابور يكبر بلا حد. الطلبات التي لها نفس key (مثل مفتاح تخزين الإرشاد)
+تشترك في توليد واحد.
+
+    jobs = JobQueue(workers=4, max_pending=32)
+    job_id = jobs.submit(lambda: client.stream(messages), key=key, on_done=save)
+    for position in jobs.positions(job_id): ...
+    text = stream_to_placeholder(jobs.follow(job_id), st.empty())
+"""
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+
+from llm_client import LLMError
+
+DEFAULT_WORKERS = 4
+DEFAULT_MAX_PENDING = 32
+DEFAULT_RETENTION = 3600  # ثوانٍ يبقى فيها الطلب المنتهي متاحاً للقراءة
+POLL_INTERVAL = 1.0  # أطول انتظار دون إعادة قيمة أثناء متابعة طلب (حتى يتمكن Streamlit من إيقاف الصفحة)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class QueueFullError(LLMError):
+    def __init__(self, pending, max_pending):
+        super().__init__(f"{pending} jobs already waiting (limit {max_pending})")
+        self.pending = pending
+        self.max_pending = max_pending
+
+
+class Job:
+    def __init__(self, job_id, generate, key=None, on_done=None):
+        self.id = job_id
+        self.key = key
+        self.generate = generate
+        self.on_done = on_done
+        self.status = QUEUED
+        self.deltas = []  # الأجزاء المبثوثة بالترتيب
+        self.text = ""  # يكبر أثناء تنفيذ الطلب
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def finished(self):
+        return self.status in (DONE, FAILED)
+
+
+class JobQueue:
+    """مشترك بين جميع جلسات عملية التطبيق (يُنشأ عبر st.cache_resource)."""
+
+    def __init__(self, workers=DEFAULT_WORKERS, max_pending=DEFAULT_MAX_PENDING, retention=DEFAULT_RETENTION):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.retention = retention
+        self._jobs = {}
+        self._by_key = {}
+        self._pending = deque()
+        self._running = 0
+        lock = threading.Lock()
+        self._condition = threading.Condition(lock)  # أُضيف طلب (يوقظ خيطاً عاملاً)
+        self._updated = threading.Condition(lock)  # بدأ طلب أو أنتج نصاً أو انتهى (يوقظ المتابعين)
+        for i in range(workers):
+            threading.Thread(target=self._run, name=f"llm-job-worker-{i}", daemon=True).start()
+
+    def submit(self, generate, key=None, on_done=None):
+        """
+        يضيف generate() إلى الطابور، وهي دالة تعيد أجزاء النص (مثل lambda: client.stream(messages))،
+        ويعيد رقم الطلب. إذا وُجد طلب بنفس key منتظر أو قيد التنفيذ أو ناجح يُعاد رقمه بدلاً من ذلك.
+        تُستدعى on_done(text) من الخيط العامل بعد رد ناجح غير فارغ.
+        يرفع QueueFullError إذا كان max_pending طلباً في الانتظار.
+        """
+        with self._condition:
+            self._purge()
+            existing = self._jobs.get(self._by_key.get(key)) if key is not None else None
+            if existing is not None and existing.status != FAILED:
+                return existing.id
+            if len(self._pending) >= self.max_pending:
+                raise QueueFullError(len(self._pending), self.max_pending)
+            job = Job(uuid.uuid4().hex, generate, key, on_done)
+            self._jobs[job.id] = job
+            if key is not None:
+                self._by_key[key] = job.id
+            self._pending.append(job.id)
+            self._condition.notify()
+            return job.id
+
+    def get(self, job_id):
+        """الطلب (Job)، أو None إذا كان الرقم غير معروف أو حُذف الطلب."""
+        with self._condition:
+            return self._jobs.get(job_id)
+
+    def position(self, job_id):
+        """ترتيب الطلب في الانتظار (يبدأ من 1)، و 0 بعد أن يبدأه خيط عامل، و None إذا كان غير معروف."""
+        with self._condition:
+            try:
+                return self._pending.index(job_id) + 1
+            except ValueError:
+                return 0 if job_id in self._jobs else None
+
+    def positions(self, job_id, interval=POLL_INTERVAL):
+        """
+        يعيد ترتيب الطلب في الانتظار (يبدأ من 1) عند تغيره، ومرة كل interval ثانية على الأقل،
+        حتى يبدأه خيط عامل أو يكون الرقم غير معروف.
+        """
+        last = None
+        while True:
+            with self._condition:
+                deadline = time.monotonic() + interval
+                while job_id in self._pending and self._pending.index(job_id) + 1 == last:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._updated.wait(remaining)
+                if job_id not in self._pending:
+                    return
+                position = self._pending.index(job_id) + 1
+            last = position
+            yield position
+
+    def follow(self, job_id, interval=POLL_INTERVAL):
+        """
+        يعيد أجزاء نص الطلب من أولها أثناء توليدها حتى ينتهي، وجزءاً فارغاً بعد interval ثانية دون
+        نص جديد. يرفع LLMError بخطأ الطلب إذا فشل، أو إذا كان الرقم غير معروف.
+        """
+        sent = 0
+        while True:
+            with self._condition:
+                job = self._jobs.get(job_id)
+                if job is None:
+                    raise LLMError("job expired or unknown")
+                if len(job.deltas) == sent and not job.finished:
+                    self._updated.wait(interval)
+                new = job.deltas[sent:]
+                finished = job.finished
+            sent += len(new)
+            if new:
+                yield from new
+            elif not finished:
+                yield ""
+            if finished:
+                if job.status == FAILED:
+                    raise LLMError(job.error)
+                return
+
+    def stats(self):
+        with self._condition:
+            return {
+                "pending": len(self._pending),
+                "running": self._running,
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "jobs": len(self._jobs),
+            }
+
+    def _purge(self):
+        cutoff = time.time() - self.retention
+        for job in [job for job in self._jobs.values() if job.finished and job.finished_at < cutoff]:
+            del self._jobs[job.id]
+            if self._by_key.get(job.key) == job.id:
+                del self._by_key[job.key]
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._pending:
+                    self._condition.wait()
+                job = self._jobs[self._pending.popleft()]
+                job.status = RUNNING
+                job.started_at = time.time()
+                self._running += 1
+                self._updated.notify_all()
+            try:
+                for delta in job.generate():
+                    with self._condition:
+                        job.deltas.append(delta)
+                        job.text += delta
+                        self._updated.notify_all()
+                job.text = job.text.strip()
+                status = DONE
+            except Exception as e:
+                job.error = str(e)
+                status = FAILED
+            if status == DONE and job.on_done is not None and job.text:
+                try:
+                    job.on_done(job.text)
+                except Exception as e:
+                    print(f"job {job.id}: on_done failed: {e}", file=sys.stderr)
+            job.generate = job.on_done = None
+            with self._condition:
+                job.finished_at = time.time()
+                job.status = status
+                self._running -= 1
+                self._updated.notify_all()
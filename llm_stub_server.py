@@ -0,0 +1,125 @@
+"""
+بديل محلي لواجهة chat-completions من OpenAI، لاختبار البث في LLMClient بدون شبكة أو تكلفة استخدام.
+
+    python llm_stub_server.py --port 8765 --first-token-delay 0.5 --token-delay 0.05
+
+يرد POST /v1/chat/completions برد ثابت مبني من آخر رسالة للمستخدم. مع "stream": true يُرسل الرد
+كأحداث server-sent events بنفس صيغة الأجزاء في الواجهة الأصلية (حدث data: {...} لكل كلمة، ثم
+data: [DONE]).
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_WORDS = 60
+
+
+def stub_reply(messages, n_words=DEFAULT_WORDS):
+    """رد ثابت: كلمات آخر رسالة للمستخدم مكررة حتى n_words كلمة."""
+    prompt = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+    words = prompt.split() or ["stub"]
+    return " ".join(words[i % len(words)] for i in range(n_words))
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    first_token_delay = 0.0
+    token_delay = 0.0
+    n_words = DEFAULT_WORDS
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self.send_error(404)
+            return
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        model = body.get("model", "stub")
+        reply = stub_reply(body.get("messages", []), self.n_words)
+        if body.get("stream"):
+            try:
+                self._stream(model, reply)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # توقف العميل (مثلاً انتهت مهلة القراءة لديه)
+        else:
+            time.sleep(self.first_token_delay + self.token_delay * self.n_words)
+            self._send_json({
+                "id": "chatcmpl-stub",
+                "object": "chat.completion",
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": reply}, "finish_reason": "stop"}],
+            })
+
+    def _send_json(self, payload):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _stream(self, model, reply):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        time.sleep(self.first_token_delay)
+        words = reply.split(" ")
+        for i, word in enumerate(words):
+            chunk = {
+                "id": "chatcmpl-stub",
+                "object": "chat.completion.chunk",
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": word if i == 0 else " " + word}, "finish_reason": None}],
+            }
+            self._write_chunk(f"data: {json.dumps(chunk)}\n\n")
+            time.sleep(self.token_delay)
+        self._write_chunk("data: [DONE]\n\n")
+        self._write_chunk("")
+
+    def _write_chunk(self, text):
+        data = text.encode("utf-8")
+        self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+
+def make_server(port=0, first_token_delay=0.0, token_delay=0.0, n_words=DEFAULT_WORDS):
+    """خادم على 127.0.0.1 (المنفذ 0 يختار منفذاً متاحاً؛ انظر server.server_address)."""
+    handler = type("ConfiguredStubHandler", (StubHandler,), {
+        "first_token_delay": first_token_delay,
+        "token_delay": token_delay,
+        "n_words": n_words,
+    })
+    return ThreadingHTTPServer(("127.0.0.1", port), handler)
+
+
+def serve_in_thread(**kwargs):
+    """يشغل الخادم في خيط خلفي ويعيد (server, api_base)."""
+    server = make_server(**kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    return server, f"http://{host}:{port}/v1"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local stub for the OpenAI chat-completions API.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--first-token-delay", type=float, default=0.5, help="seconds before the first chunk")
+    parser.add_argument("--token-delay", type=float, default=0.05, help="seconds between chunks")
+    parser.add_argument("--words", type=int, default=DEFAULT_WORDS, help="words per reply")
+    args = parser.parse_args(argv)
+    server = make_server(args.port, args.first_token_delay, args.token_delay, args.words)
+    print(f"stub listening on http://127.0.0.1:{server.server_address[1]}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,9 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import random
 
+from compact_session import CompactSession
+from riasec_scoring import RiasecScorer
+
 # Define 10 questions per category
 questions_dict = {
     "Realistic": [
@@ -99,25 +102,34 @@ career_database = {
     "CRI": ["Accountant", "Auditor", "Administrative Assistant"],
 }
 
-# Initialize session state for selected questions
-if "selected_questions" not in st.session_state:
-    st.session_state.selected_questions = []
-    for category, questions in questions_dict.items():
-        selected_questions = random.sample(questions, 3)  # Select 3 random questions per category
-        for question in selected_questions:
-            st.session_state.selected_questions.append({"question": question, "category": category})
+# Flat question list (row ids are stored in the session instead of the question text)
+question_texts = [question for questions in questions_dict.values() for question in questions]
+question_categories = [category for category, questions in questions_dict.items() for _ in questions]
+
+# Answer options (Yes/No with emojis); a "Yes" scores one point for the question's category
+RESPONSE_OPTIONS = ["😊 Yes, definitely!", "🙅‍♂️ No, not really"]
+
+
+# Shared RIASEC scorer with the category weight matrix built once per process
+@st.cache_resource
+def load_scorer():
+    return RiasecScorer([1, 0], question_categories, categories=list(questions_dict))
 
-# Shuffle the selected questions only once
-if "shuffled_questions" not in st.session_state:
-    st.session_state.shuffled_questions = random.sample(st.session_state.selected_questions, len(st.session_state.selected_questions))
+
+scorer = load_scorer()
+
+# Initialize session state: select 3 random questions per category and shuffle them only once
+if "survey" not in st.session_state:
+    selected_rows = []
+    for category in questions_dict:
+        category_rows = [row for row, row_category in enumerate(question_categories) if row_category == category]
+        selected_rows.extend(random.sample(category_rows, 3))  # Select 3 random questions per category
+    st.session_state.survey = CompactSession(random.sample(selected_rows, len(selected_rows)))
+survey = st.session_state.survey
 
 # Initialize other session states
 if "current_question" not in st.session_state:
     st.session_state.current_question = 0
-if "scores" not in st.session_state:
-    st.session_state.scores = {"Realistic": 0, "Investigative": 0, "Artistic": 0, "Social": 0, "Enterprising": 0, "Conventional": 0}
-if "answers" not in st.session_state:
-    st.session_state.answers = []
 
 # Function to render a styled question widget with numbering
 def render_question_widget(question_text, question_number):
@@ -138,28 +150,26 @@ def render_question_widget(question_text, question_number):
     )
 
 # Main logic
-if st.session_state.current_question < len(st.session_state.shuffled_questions):
+if st.session_state.current_question < len(survey.question_rows):
     # Render current question
     current_q_index = st.session_state.current_question
-    current_q = st.session_state.shuffled_questions[current_q_index]
+    question_row = survey.question_rows[current_q_index]
 
     # Show the styled question widget with numbering
-    render_question_widget(current_q["question"], current_q_index + 1)
+    render_question_widget(question_texts[question_row], current_q_index + 1)
 
     # Answer options (Yes/No with emojis)
     response = st.radio(
         "Your response:",
-        options=["😊 Yes, definitely!", "🙅‍♂️ No, not really"],
+        options=RESPONSE_OPTIONS,
         key=f"q_{current_q_index}",
     )
 
     # "Next" button
     if st.button("Next"):
         if response:
-            # Record the response and update scores
-            st.session_state.answers.append(response)
-            if response == "😊 Yes, definitely!":
-                st.session_state.scores[current_q["category"]] += 1
+            # Record the response and update the session scores
+            scorer.record_response(survey, current_q_index, RESPONSE_OPTIONS.index(response))
 
             # Move to the next question
             st.session_state.current_question += 1
@@ -173,14 +183,16 @@ else:
     st.write("### All questions completed!")
     st.write("### Your Holland Code Personality Results")
 
+    scores = scorer.score_dict(survey)
+
     # Check if all scores are zero
-    if all(score == 0 for score in st.session_state.scores.values()):
+    if all(score == 0 for score in scores.values()):
         st.write("It seems you answered 'No' to all questions.")
         st.write("Based on your responses, we could not determine a strong personality match.")
         st.write("Consider answering 'Yes' to questions that resonate with you.")
     else:
         # Sort scores to determine the dominant personality types
-        sorted_scores = sorted(st.session_state.scores.items(), key=lambda x: x[1], reverse=True)
+        sorted_scores = sorted(scores.items(), key=lambda x: x[1], reverse=True)
         top_categories = sorted_scores[:3]
 
         # Generate Holland Code
@@ -197,19 +209,19 @@ else:
         # Visualize scores with progress bars
         st.write("### Category Scores:")
         max_score = 3  # Max score = 3 questions per category
-        for category, score in st.session_state.scores.items():
+        for category, score in scores.items():
             st.write(f"**{category}: {score}/{max_score}**")
             st.progress(score / max_score)
 
         # Visualize scores with a pie chart
         st.write("### Score Distribution:")
-        if sum(st.session_state.scores.values()) == 0:
+        if sum(scores.values()) == 0:
             st.write("No scores to display in the distribution chart. All categories scored zero.")
         else:
             fig, ax = plt.subplots()
             ax.pie(
-                st.session_state.scores.values(),
-                labels=st.session_state.scores.keys(),
+                scores.values(),
+                labels=scores.keys(),
                 autopct="%1.1f%%",
                 startangle=90,
             )
@@ -218,9 +230,6 @@ else:
 
     # Restart button
     if st.button("Restart"):
-        del st.session_state["selected_questions"]
-        del st.session_state["shuffled_questions"]
+        del st.session_state["survey"]
         del st.session_state["current_question"]
-        del st.session_state["scores"]
-        del st.session_state["answers"]
         st.experimental_rerun()
@@ -1,10 +1,10 @@
 import streamlit as st
-import librosa
-import numpy as np
 import soundfile as sf
-import tempfile
 from streamlit_mic_recorder import mic_recorder
 
+from audio_io import decode
+from audio_worker import AudioFeatureService, QueueFullError
+
 # Define Holland Code Rules
 def classify_holland_code(features):
     pitch, speech_rate, intensity, prosody_variation, pause_duration = features
@@ -31,61 +31,38 @@ def classify_holland_code(features):
         reason = "Features do not strongly match any category."
         return "Uncertain", reason
 
-# Speech feature extraction
-def extract_features(audio_file):
-    y, sr = librosa.load(audio_file, sr=None)
-    
-    # Ensure proper handling of silence
-    y, _ = librosa.effects.trim(y)
-    
-    # Extract pitch using yin
-    try:
-        pitch = np.mean(librosa.yin(y, librosa.note_to_hz('C2'), librosa.note_to_hz('C7'), sr=sr))
-    except:
-        pitch = 0.0  # Handle silent audio
-    
-    # Calculate speech rate
-    intervals = librosa.effects.split(y, top_db=20)
-    speech_duration = sum((end - start) for start, end in intervals) / sr
-    total_duration = len(y) / sr
-    speech_rate = (len(intervals) / speech_duration) if speech_duration > 0 else 0.0
-
-    # Intensity (Root Mean Square Energy)
-    rms = librosa.feature.rms(y=y)
-    intensity = "dynamic" if np.std(rms) > 0.05 else "steady"
+# Speech feature extraction (pitch, speech rate, intensity, prosody variation, pause duration)
+# runs in worker processes shared by all sessions, see acoustic_features.prosody_features
+@st.cache_resource
+def get_audio_service():
+    return AudioFeatureService()
 
-    # Prosody variation (MFCC standard deviation)
-    prosody_variation = np.std(librosa.feature.mfcc(y=y, sr=sr))
-
-    # Average pause duration
-    pauses = [(start - end) for end, start in zip(intervals[1:], intervals[:-1])]
-    pause_duration = np.mean(pauses) / sr if pauses else 0.0
-
-    return pitch, speech_rate, intensity, prosody_variation, pause_duration
+def extract_features(recording):
+    return get_audio_service().extract(recording, "prosody")
 
 # Streamlit Interface
 st.title("Holland Code Speech Classifier")
 
 # Mic Recorder Integration
 st.write("### Record Your Voice")
-recorded_audio = mic_recorder(start_prompt="⏺️", stop_prompt="⏹️", key='recorder')
+recorded_audio = mic_recorder(start_prompt="⏺️", stop_prompt="⏹️", format="wav", key='recorder')
 
 if recorded_audio:
-    # Save recorded audio to a temporary file
-    temp_audio_file = tempfile.NamedTemporaryFile(delete=False, suffix=".wav")
-    with open(temp_audio_file.name, "wb") as f:
-        f.write(recorded_audio['bytes'])
-    st.session_state["audio_file"] = temp_audio_file.name
-    st.audio(temp_audio_file.name, format='audio/wav')
-    st.success("Recording saved. Proceed to analysis.")
+    # Keep the decoded recording (mono 16-bit PCM at 16 kHz) in memory instead of a temporary file
+    try:
+        st.session_state["recording"] = decode(recorded_audio['bytes'])
+        st.audio(recorded_audio['bytes'], format='audio/wav')
+        st.success("Recording saved. Proceed to analysis.")
+    except Exception as e:
+        st.error(f"Error reading the recording: {e}")
 
 # Main page for analysis
 st.write("Once you've recorded your voice, analyze it here.")
 
-if "audio_file" in st.session_state and st.session_state["audio_file"]:
+if st.session_state.get("recording") is not None:
     if st.button("Analyze Holland Code"):
         try:
-            features = extract_features(st.session_state["audio_file"])
+            features = extract_features(st.session_state["recording"])
             category, reason = classify_holland_code(features)
 
             st.success(f"Your Holland Code category is: {category}")
@@ -97,6 +74,8 @@ if "audio_file" in st.session_state and st.session_state["audio_file"]:
             st.write(f"- Intensity: {features[2]}")
             st.write(f"- Prosody Variation: {features[3]:.2f}")
             st.write(f"- Pause Duration: {features[4]:.2f} seconds")
+        except QueueFullError as e:
+            st.warning(f"The server is busy analyzing other recordings ({e.pending} in progress), please try again shortly.")
         except Exception as e:
             st.error(f"Error analyzing the audio: {e}")
 
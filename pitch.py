@@ -0,0 +1,139 @@
+"""
+Fundamental frequency (F0) estimation for the voice analysis apps, in three accuracy tiers:
+
+    fast         vectorized YIN over all frames at once (FFT difference function), searching
+                 only the speech range; voicing from the YIN aperiodicity threshold
+    downsampled  pyin on the recording resampled to DOWNSAMPLED_SR (speech F0 is far below
+                 its Nyquist frequency) with 0.2-semitone pitch states instead of 0.1, which
+                 shrinks both the lag search per frame and the HMM decoding
+    accurate     pyin at the original rate (probabilistic YIN with HMM voicing)
+
+All tiers search SPEECH_F0_MIN..SPEECH_F0_MAX instead of C2..C7 and return one value per
+hop (NaN for unvoiced frames), so callers can switch tiers without other changes. The
+deployment picks a tier with the PITCH_TIER environment variable; bench_pitch.py compares
+their speed and agreement.
+"""
+import os
+
+import librosa
+import numpy as np
+import scipy.fft
+
+SPEECH_F0_MIN = 65.0  # Hz, below the lowest adult male voices
+SPEECH_F0_MAX = 400.0  # Hz, above children's and high female voices
+DOWNSAMPLED_SR = 8000
+DOWNSAMPLED_RESOLUTION = 0.2  # semitones per pyin pitch state (pyin's default is 0.1)
+HOP_LENGTH = 512
+YIN_THRESHOLD = 0.15  # max aperiodicity of a voiced frame
+TIERS = ("fast", "downsampled", "accurate")
+DEFAULT_TIER = os.environ.get("PITCH_TIER", "accurate")
+
+
+def _frame_length(max_period):
+    """Shortest power of two (at least 256) holding two of the longest pitch periods (`max_period` samples, from fmin)."""
+    return max(256, 1 << int(np.ceil(np.log2(2 * max_period + 1))))
+
+
+def yin_f0(y, sr, fmin=SPEECH_F0_MIN, fmax=SPEECH_F0_MAX, hop_length=HOP_LENGTH, threshold=YIN_THRESHOLD):
+    """
+    YIN (de Cheveigné & Kawahara, 2002) for all frames in one batch of FFTs. Frames are
+    centered like librosa's features (frame t starts at t * hop_length - frame_length // 2),
+    so the output has 1 + len(y) // hop_length values.
+    """
+    frame_length = yin_frame_length(sr, fmin)
+    y = np.asarray(y, dtype=np.float64)
+    padded = np.pad(y, frame_length // 2)
+    n_frames = 1 + len(y) // hop_length
+    padded = np.pad(padded, (0, max(0, (n_frames - 1) * hop_length + frame_length - len(padded))))
+    frames = librosa.util.frame(padded, frame_length=frame_length, hop_length=hop_length, axis=0)[:n_frames]
+    return yin_frames(frames, sr, fmin, fmax, threshold)
+
+
+def yin_frame_length(sr, fmin=SPEECH_F0_MIN):
+    """Frame length yin_frames needs at `sr` to find periods down to `fmin`."""
+    return _frame_length(int(np.ceil(sr / fmin)))
+
+
+def yin_frames(frames, sr, fmin=SPEECH_F0_MIN, fmax=SPEECH_F0_MAX, threshold=YIN_THRESHOLD):
+    """
+    F0 (NaN = unvoiced) of each row of `frames` (n_frames x frame_length, with frame_length
+    at least yin_frame_length(sr, fmin)); used directly for audio that arrives in blocks.
+    """
+    n_frames, frame_length = frames.shape
+    min_period = max(1, int(np.floor(sr / fmax)))
+    max_period = int(np.ceil(sr / fmin))
+    window = frame_length - max_period
+
+    # d(tau) = sum_j (x_j - x_{j+tau})^2 = E(0) + E(tau) - 2 r(tau) over a window of `window` samples
+    n_fft = scipy.fft.next_fast_len(frame_length + window)
+    spectrum = scipy.fft.rfft(frames, n_fft, axis=1)
+    head = scipy.fft.rfft(frames[:, :window], n_fft, axis=1)
+    correlation = scipy.fft.irfft(spectrum * np.conj(head), n_fft, axis=1)[:, :max_period + 1]
+    energy = np.concatenate([np.zeros((n_frames, 1)), np.cumsum(frames ** 2, axis=1)], axis=1)
+    lags = np.arange(max_period + 1)
+    window_energy = energy[:, lags + window] - energy[:, lags]
+    difference = np.maximum(window_energy[:, :1] + window_energy - 2 * correlation, 0)
+
+    # cumulative mean normalized difference d'(tau) = d(tau) * tau / sum_{k<=tau} d(k)
+    cumulative = np.cumsum(difference[:, 1:], axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cmnd = difference[:, 1:] * lags[1:] / cumulative
+    cmnd = np.nan_to_num(cmnd, nan=1.0, posinf=1.0)[:, min_period - 1:]
+
+    # first local minimum below the threshold, else no pitch (unvoiced)
+    is_trough = np.zeros_like(cmnd, dtype=bool)
+    is_trough[:, 1:-1] = (cmnd[:, 1:-1] <= cmnd[:, :-2]) & (cmnd[:, 1:-1] < cmnd[:, 2:])
+    candidates = is_trough & (cmnd < threshold)
+    voiced = candidates.any(axis=1) & (window_energy[:, 0] > 1e-10 * window)
+    best = candidates.argmax(axis=1)
+
+    # parabolic interpolation around the trough for sub-sample periods
+    rows = np.arange(n_frames)
+    left = cmnd[rows, np.maximum(best - 1, 0)]
+    center = cmnd[rows, best]
+    right = cmnd[rows, np.minimum(best + 1, cmnd.shape[1] - 1)]
+    curvature = left - 2 * center + right
+    with np.errstate(divide="ignore", invalid="ignore"):
+        shift = np.where(np.abs(curvature) > 1e-12, 0.5 * (left - right) / curvature, 0.0)
+    period = best + min_period + np.clip(shift, -1, 1)
+
+    f0 = np.full(n_frames, np.nan)
+    f0[voiced] = sr / period[voiced]
+    return f0
+
+
+def pyin_f0(y, sr, fmin=SPEECH_F0_MIN, fmax=SPEECH_F0_MAX, hop_length=HOP_LENGTH, resolution=0.1):
+    """librosa.pyin over the speech range, with NaN for unvoiced frames."""
+    frame_length = yin_frame_length(sr, fmin)
+    f0, _, _ = librosa.pyin(
+        y, fmin=fmin, fmax=fmax, sr=sr, frame_length=frame_length, hop_length=hop_length, resolution=resolution
+    )
+    return f0
+
+
+def downsampled_f0(y, sr, fmin=SPEECH_F0_MIN, fmax=SPEECH_F0_MAX, hop_length=HOP_LENGTH):
+    """pyin at DOWNSAMPLED_SR, mapped back to the frames of `hop_length` samples at `sr`."""
+    n_frames = 1 + len(y) // hop_length
+    if sr > DOWNSAMPLED_SR:
+        y = librosa.resample(np.asarray(y, dtype=np.float32), orig_sr=sr, target_sr=DOWNSAMPLED_SR, res_type="polyphase")
+    target_sr = min(sr, DOWNSAMPLED_SR)
+    target_hop = max(1, round(hop_length * target_sr / sr))
+    f0 = pyin_f0(y, target_sr, fmin, fmax, target_hop, DOWNSAMPLED_RESOLUTION)
+    # the rounded hop drifts from the original one, so pick the nearest frame in time
+    nearest = np.rint(np.arange(n_frames) * hop_length * target_sr / (sr * target_hop)).astype(int)
+    return f0[np.minimum(nearest, len(f0) - 1)]
+
+
+def estimate_f0(y, sr, tier=None, fmin=SPEECH_F0_MIN, fmax=SPEECH_F0_MAX, hop_length=HOP_LENGTH):
+    """
+    F0 in Hz per hop of `hop_length` samples at `sr` (NaN = unvoiced) with the given tier,
+    or DEFAULT_TIER (PITCH_TIER environment variable, "accurate" if unset).
+    """
+    tier = tier or DEFAULT_TIER
+    if tier == "fast":
+        return yin_f0(y, sr, fmin, fmax, hop_length)
+    if tier == "downsampled":
+        return downsampled_f0(y, sr, fmin, fmax, hop_length)
+    if tier == "accurate":
+        return pyin_f0(y, sr, fmin, fmax, hop_length)
+    raise ValueError(f"unknown pitch tier {tier!r} (expected one of {TIERS})")
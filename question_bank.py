@@ -0,0 +1,121 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from compact_session import MAX_BANK_ROWS
+
+# فئات هولاند بالترتيب المستخدم في التطبيقات
+CATEGORIES = ("واقعي", "تحليلي", "فني", "اجتماعي", "ريادي", "تقليدي")
+
+
+def _readonly(values, dtype=None):
+    array = np.asarray(values, dtype=dtype)
+    array.flags.writeable = False
+    return array
+
+
+class QuestionBank:
+    """
+    بنك أسئلة (أو أنشطة أو مواد) محمل من ملف CSV بعمودين: "Category" وعمود النص.
+    يُبنى مرة واحدة لكل عملية ويُشارك بين جميع الجلسات، لذلك جميع الحقول للقراءة فقط:
+    - frame: الجدول كما في الملف (مشترك؛ لا يُعدّل).
+    - texts / categories: النص والفئة لكل صف (tuple).
+    - category_rows: الفئة -> مصفوفة أرقام صفوفها (للقراءة فقط).
+    - text_rows: النص -> مصفوفة أرقام الصفوف التي ورد فيها (مثل المادة المرتبطة بأكثر من فئة).
+    - unique_texts: (النص، رقم أول صف له) بترتيب أول ظهور.
+    """
+
+    def __init__(self, path, text_column):
+        df = pd.read_csv(path)
+        self.path = path
+        self.text_column = text_column
+        self.mtime = os.path.getmtime(path)
+        self._validate(df)
+
+        self.frame = df
+        self.texts = tuple(df[text_column].tolist())
+        self.categories = tuple(df["Category"].tolist())
+
+        groups = {}
+        for row, category in enumerate(self.categories):
+            groups.setdefault(category, []).append(row)
+        self.category_rows = {
+            category: _readonly(groups.get(category, []), dtype=np.int64) for category in CATEGORIES
+        }
+
+        text_groups = {}
+        for row, text in enumerate(self.texts):
+            text_groups.setdefault(text, []).append(row)
+        self.text_rows = {text: _readonly(rows, dtype=np.int64) for text, rows in text_groups.items()}
+        self.unique_texts = tuple((text, int(rows[0])) for text, rows in self.text_rows.items())
+
+    def _validate(self, df):
+        missing = {"Category", self.text_column} - set(df.columns)
+        if missing:
+            raise ValueError(f"{self.path}: أعمدة مفقودة {sorted(missing)}")
+        if len(df) > MAX_BANK_ROWS:
+            # أرقام الصفوف تُخزن في الجلسات كـ int16
+            raise ValueError(f"{self.path}: عدد الصفوف {len(df)} يتجاوز الحد {MAX_BANK_ROWS}")
+        if df[["Category", self.text_column]].isna().any().any():
+            raise ValueError(f"{self.path}: توجد قيم فارغة في العمودين Category و {self.text_column}")
+        unknown = set(df["Category"]) - set(CATEGORIES)
+        if unknown:
+            raise ValueError(f"{self.path}: فئات غير معروفة {sorted(unknown)}")
+
+    def __len__(self):
+        return len(self.texts)
+
+    def sample_rows(self, n_per_category, rng):
+        """
+        عينة طبقية: حتى n_per_category صفاً عشوائياً (بدون تكرار) من كل فئة، بترتيب الفئات
+        الأبجدي كما في groupby("Category"). تعيد قائمة أرقام صفوف فقط بدلاً من نسخة من الجدول.
+        """
+        rows = []
+        for category in sorted(self.category_rows):
+            category_rows = self.category_rows[category]
+            if len(category_rows) == 0:
+                continue
+            picked = rng.choice(category_rows, size=min(n_per_category, len(category_rows)), replace=False)
+            rows.extend(picked.tolist())
+        return rows
+
+    def text_categories(self, text):
+        """جميع الفئات المرتبطة بالنص (مثل مادة دراسية مرتبطة بأكثر من فئة)."""
+        return [self.categories[row] for row in self.text_rows.get(text, ())]
+
+
+def new_session_seed():
+    """بذرة عشوائية جديدة لجلسة (تُحفظ مع الجلسة لإعادة إنتاج نفس العينة عند المراجعة)."""
+    return int(np.random.SeedSequence().entropy % (2**63))
+
+
+def session_rng(seed, stream):
+    """
+    مولد أرقام مستقل لكل استخدام داخل الجلسة (مثلاً 0 للأسئلة و 1 للأنشطة)،
+    بحيث تعطي نفس البذرة نفس العينات دائماً بغض النظر عن ترتيب الخطوات.
+    """
+    return np.random.default_rng([seed, stream])
+
+
+_banks = {}
+_banks_lock = threading.Lock()
+
+
+def load_bank(path, text_column):
+    """
+    إرجاع البنك المشترك للملف، مع إعادة تحميله فقط إذا تغير وقت تعديل الملف (mtime).
+    آمنة للاستدعاء من عدة جلسات Streamlit في نفس الوقت.
+    """
+    key = (os.path.abspath(path), text_column)
+    mtime = os.path.getmtime(path)
+    bank = _banks.get(key)
+    if bank is not None and bank.mtime == mtime:
+        return bank
+    with _banks_lock:
+        bank = _banks.get(key)
+        if bank is None or bank.mtime != mtime:
+            bank = QuestionBank(path, text_column)
+            _banks[key] = bank
+        return bank
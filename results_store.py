@@ -0,0 +1,183 @@
+"""
+حفظ نتائج استبيانات هولاند في قاعدة بيانات SQLite مدمجة (بديل save_results_to_csv).
+
+- وضع WAL: القراءة (التحليلات) لا تنتظر الكتابة، وعدة جلسات أو عمليات تكتب في نفس الملف بأمان.
+- كتابة مؤجلة (write-behind): save() تضع السجل في طابور وتعود فوراً، وخيط كتابة واحد لكل عملية
+  يجمع السجلات المتراكمة ويكتبها في معاملة واحدة (حتى BATCH_SIZE سجل)، فلا تنتظر الواجهة القرص.
+- سجل واحد لكل جلسة (session_id)، وإعادة الحفظ من نفس الجلسة تحدّث سجلها بدلاً من تكراره.
+- فهارس للاستعلام حسب التاريخ، والفئة الأعلى، والمدرسة (مع التاريخ).
+
+تُحفظ الإجابات بصيغة CompactSession نفسها (مصفوفات NumPy كبايتات) ويمكن استرجاعها عبر
+session_from_record لإعادة تسجيلها دفعة واحدة (riasec_scoring).
+"""
+import datetime
+import queue
+import sqlite3
+import sys
+import threading
+
+import numpy as np
+import pandas as pd
+
+from compact_session import CompactSession
+from question_bank import CATEGORIES
+from riasec_scoring import holland_codes
+from usoc_index import RIASEC_LETTERS
+
+DEFAULT_PATH = "results.db"
+BATCH_SIZE = 500  # أقصى عدد سجلات في معاملة واحدة
+FLUSH_INTERVAL = 0.05  # مهلة تجميع السجلات المتتالية قبل الكتابة (ثانية)
+BUSY_TIMEOUT = 30  # انتظار قفل الكتابة من عملية أخرى (ثانية)
+
+SCORE_COLUMNS = [f"score_{letter.lower()}" for letter in RIASEC_LETTERS]
+SESSION_COLUMNS = ["question_rows", "responses", "activity_rows", "activity_selected", "subject_selected"]
+SESSION_DTYPES = {
+    "question_rows": np.int16,
+    "responses": np.int8,
+    "activity_rows": np.int16,
+    "activity_selected": bool,
+    "subject_selected": bool,
+}
+COLUMNS = ["session_id", "app", "school", "created_at", "category", "code"] + SCORE_COLUMNS + SESSION_COLUMNS
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS assessments (
+    session_id TEXT PRIMARY KEY,
+    app TEXT NOT NULL,
+    school TEXT,
+    created_at TEXT NOT NULL,
+    category TEXT NOT NULL,
+    code TEXT NOT NULL,
+    {", ".join(f"{column} INTEGER NOT NULL" for column in SCORE_COLUMNS)},
+    {", ".join(f"{column} BLOB" for column in SESSION_COLUMNS)}
+);
+CREATE INDEX IF NOT EXISTS idx_assessments_created_at ON assessments (created_at);
+CREATE INDEX IF NOT EXISTS idx_assessments_category ON assessments (category, created_at);
+CREATE INDEX IF NOT EXISTS idx_assessments_school ON assessments (school, created_at);
+"""
+
+UPSERT = f"""
+INSERT INTO assessments ({", ".join(COLUMNS)}) VALUES ({", ".join("?" * len(COLUMNS))})
+ON CONFLICT (session_id) DO UPDATE SET
+    {", ".join(f"{column} = excluded.{column}" for column in COLUMNS[1:])}
+"""
+
+_STOP = object()
+
+
+def connect(path):
+    connection = sqlite3.connect(path, timeout=BUSY_TIMEOUT, check_same_thread=False)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    return connection
+
+
+def make_record(session_id, app, survey, scores, school=None, created_at=None):
+    """صف جدول assessments لجلسة: النقاط الست بترتيب CATEGORIES، والفئة الأعلى، والكود (أعلى فئتين)."""
+    scores = np.asarray(scores)
+    created_at = created_at or datetime.datetime.now(datetime.timezone.utc)
+    return (
+        session_id,
+        app,
+        school,
+        created_at.isoformat(timespec="seconds"),
+        CATEGORIES[int(np.argmax(scores))],
+        holland_codes(scores, 2)[0],
+        *(int(score) for score in scores),
+        *(getattr(survey, column).tobytes() for column in SESSION_COLUMNS),
+    )
+
+
+def session_from_record(record):
+    """استرجاع CompactSession من صف (dict أو صف DataFrame) يحتوي أعمدة الجلسة."""
+    arrays = {column: np.frombuffer(record[column], dtype=SESSION_DTYPES[column]).copy() for column in SESSION_COLUMNS}
+    session = CompactSession(arrays["question_rows"], arrays["activity_rows"], len(arrays["subject_selected"]))
+    session.responses[:] = arrays["responses"]
+    session.activity_selected[:] = arrays["activity_selected"]
+    session.subject_selected[:] = arrays["subject_selected"]
+    session.scores[:] = [record[column] for column in SCORE_COLUMNS]
+    return session
+
+
+class ResultsStore:
+    """
+    مخزن النتائج لعملية واحدة (يُشارك بين جميع جلسات Streamlit عبر st.cache_resource).
+    save() لا تنتظر القرص؛ flush() تنتظر كتابة كل ما في الطابور (للاختبارات والتصدير).
+    """
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        with connect(path) as connection:
+            connection.executescript(SCHEMA)
+        connection.close()
+        self._queue = queue.Queue()
+        self._writer = threading.Thread(target=self._run, name="results-store-writer", daemon=True)
+        self._writer.start()
+
+    def save(self, session_id, app, survey, scores, school=None):
+        self._queue.put(make_record(session_id, app, survey, scores, school))
+
+    def flush(self):
+        self._queue.join()
+
+    def close(self):
+        self._queue.put(_STOP)
+        self._writer.join()
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        while len(batch) < BATCH_SIZE and batch[-1] is not _STOP:
+            try:
+                batch.append(self._queue.get(timeout=FLUSH_INTERVAL))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        connection = connect(self.path)
+        try:
+            while True:
+                batch = self._next_batch()
+                records = [record for record in batch if record is not _STOP]
+                try:
+                    if records:
+                        with connection:
+                            connection.executemany(UPSERT, records)
+                except sqlite3.Error as e:
+                    print(f"تعذر حفظ {len(records)} نتيجة في {self.path}: {e}", file=sys.stderr)
+                finally:
+                    for _ in batch:
+                        self._queue.task_done()
+                if len(records) < len(batch):
+                    return
+        finally:
+            connection.close()
+
+    def query(self, start=None, end=None, category=None, school=None, app=None, limit=None):
+        """
+        النتائج المحفوظة كجدول pandas مرتبة من الأحدث، مع تصفية اختيارية حسب الفترة
+        (start <= created_at < end، تاريخ أو نص ISO) والفئة الأعلى والمدرسة والتطبيق.
+        """
+        conditions, params = [], []
+        for column, operator, value in [
+            ("created_at", ">=", start),
+            ("created_at", "<", end),
+            ("category", "=", category),
+            ("school", "=", school),
+            ("app", "=", app),
+        ]:
+            if value is not None:
+                conditions.append(f"{column} {operator} ?")
+                params.append(value.isoformat() if hasattr(value, "isoformat") else value)
+        sql = "SELECT * FROM assessments"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY created_at DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        connection = connect(self.path)
+        try:
+            return pd.read_sql_query(sql, connection, params=params)
+        finally:
+            connection.close()
@@ -0,0 +1,138 @@
+"""
+محرك تسجيل نقاط RIASEC المشترك بين تطبيقات الاستبيان (HandV3.py و mainAR.py و main.py).
+
+كل عنصر يمكن أن يختاره الطالب (سؤال في البنك، نشاط، مادة دراسية) له صف في مصفوفة أوزان
+مُجهّزة مسبقاً weights بأبعاد (عدد العناصر × 6)، فيها 1 في عمود كل فئة ينتمي إليها العنصر.
+تتحول الجلسة (CompactSession) إلى متجه عناصر بالترتيب:
+    [صفوف بنك الأسئلة | صفوف بنك الأنشطة | المواد]
+قيمة السؤال هي نقاط خيار الإجابة (response_points[رقم الخيار])، وقيمة النشاط أو المادة 1 إذا اختيرت.
+نقاط الجلسة = متجه العناصر @ weights، ونقاط دفعة جلسات كاملة = مصفوفة العناصر @ weights
+(ضرب مصفوفات واحد للتحليلات).
+
+أثناء الاستبيان تُسجّل التطبيقات كل إجابة أو اختيار عبر record_response و record_activity و
+record_subject، فيُضاف إلى session.scores فرق نقاط ذلك العنصر فقط (صف واحد من weights)،
+وتُقرأ النقاط المخزنة مباشرة عبر score و score_dict.
+"""
+import numpy as np
+
+from question_bank import CATEGORIES
+from usoc_index import RIASEC_LETTERS
+
+
+def category_weights(item_categories, categories=CATEGORIES):
+    """
+    مصفوفة أوزان (عدد العناصر × عدد الفئات): لكل عنصر فئة واحدة (نص) أو قائمة فئات
+    (مثل مادة مرتبطة بأكثر من فئة).
+    """
+    weights = np.zeros((len(item_categories), len(categories)), dtype=np.int16)
+    for row, item in enumerate(item_categories):
+        for category in [item] if isinstance(item, str) else item:
+            weights[row, categories.index(category)] += 1
+    return weights
+
+
+def holland_codes(scores, length):
+    """
+    أول حرف من أعلى length فئات لكل صف في مصفوفة النقاط (عدد الجلسات × 6، بترتيب CATEGORIES).
+    عند التساوي تُقدّم الفئة الأسبق في CATEGORIES كما في الترتيب المستقر في HandV3.py.
+    """
+    order = np.argsort(-np.atleast_2d(scores), axis=1, kind="stable")[:, :length]
+    letters = np.array(list(RIASEC_LETTERS))[order]
+    return ["".join(row) for row in letters]
+
+
+class RiasecScorer:
+    """
+    - response_points: نقاط كل خيار إجابة حسب رقمه (الإجابة RESPONSE_UNANSWERED لا تحتسب).
+    - question_categories / activity_categories / subject_categories: فئة (أو فئات) كل عنصر
+      بترتيب صفوف البنوك وترتيب survey.subject_selected.
+    - categories: ترتيب أعمدة النتيجة (CATEGORIES افتراضياً).
+    """
+
+    def __init__(self, response_points, question_categories, activity_categories=(), subject_categories=(), categories=CATEGORIES):
+        self.categories = tuple(categories)
+        # نقطة إضافية بقيمة 0 في النهاية بحيث تعطي الإجابة -1 (لم يُجب) صفراً عند الفهرسة
+        self.response_points = np.append(np.asarray(response_points, dtype=np.int16), 0)
+        self.n_questions = len(question_categories)
+        self.n_activities = len(activity_categories)
+        self.n_subjects = len(subject_categories)
+        self.weights = np.vstack([
+            category_weights(question_categories, self.categories),
+            category_weights(activity_categories, self.categories),
+            category_weights(subject_categories, self.categories),
+        ])
+        self.weights.flags.writeable = False
+
+    @classmethod
+    def from_banks(cls, response_points, questions_bank, activities_bank=None, subject_categories=()):
+        """نموذج مبني من البنوك المشتركة (question_bank.QuestionBank)."""
+        return cls(
+            response_points,
+            questions_bank.categories,
+            activities_bank.categories if activities_bank is not None else (),
+            subject_categories,
+        )
+
+    @property
+    def n_items(self):
+        return self.weights.shape[0]
+
+    def fill_items(self, session, out):
+        """كتابة متجه عناصر الجلسة في out (صف بطول n_items مُصفّر مسبقاً)."""
+        out[session.question_rows] = self.response_points[session.responses]
+        activities = out[self.n_questions:self.n_questions + self.n_activities]
+        activities[session.activity_rows[session.activity_selected]] = 1
+        out[self.n_questions + self.n_activities:][:len(session.subject_selected)] = session.subject_selected
+        return out
+
+    def item_vector(self, session):
+        return self.fill_items(session, np.zeros(self.n_items, dtype=np.int16))
+
+    def item_matrix(self, sessions):
+        """مصفوفة عناصر (عدد الجلسات × n_items) لدفعة جلسات."""
+        matrix = np.zeros((len(sessions), self.n_items), dtype=np.int16)
+        for row, session in enumerate(sessions):
+            self.fill_items(session, matrix[row])
+        return matrix
+
+    def record_response(self, session, index, option):
+        """يسجّل رقم خيار الإجابة للسؤال رقم index ويضيف فرق نقاطه إلى session.scores."""
+        delta = self.response_points[option] - self.response_points[session.responses[index]]
+        session.responses[index] = option
+        session.scores += delta * self.weights[session.question_rows[index]]
+
+    def record_activity(self, session, index, selected):
+        """يسجّل اختيار (أو إلغاء اختيار) النشاط رقم index من الأنشطة المعروضة في الجلسة."""
+        if session.activity_selected[index] != selected:
+            session.activity_selected[index] = selected
+            row = self.weights[self.n_questions + session.activity_rows[index]]
+            session.scores += row if selected else -row
+
+    def record_subject(self, session, index, selected):
+        """يسجّل اختيار (أو إلغاء اختيار) المادة رقم index (بترتيب subject_categories)."""
+        if session.subject_selected[index] != selected:
+            session.subject_selected[index] = selected
+            row = self.weights[self.n_questions + self.n_activities + index]
+            session.scores += row if selected else -row
+
+    def rescore(self, session):
+        """يعيد حساب session.scores كاملة من الإجابات والاختيارات (لجلسة بُنيت من مصفوفاتها مباشرة)."""
+        session.scores[:] = self.item_vector(session) @ self.weights.astype(np.int32)
+        return session.scores
+
+    def score(self, session):
+        """متجه نقاط الجلسة المخزن (6 قيم بترتيب categories)."""
+        return session.scores.astype(np.int32)
+
+    def score_dict(self, session):
+        """النقاط كقاموس {الفئة: النقاط} بترتيب categories (للعرض والرسوم)."""
+        return dict(zip(self.categories, session.scores.tolist()))
+
+    def score_batch(self, items):
+        """
+        نقاط دفعة جلسات مكتملة بضرب مصفوفات واحد: items إما مصفوفة عناصر جاهزة
+        (عدد الجلسات × n_items) أو قائمة جلسات. تعيد مصفوفة (عدد الجلسات × 6).
+        """
+        if not isinstance(items, np.ndarray):
+            items = self.item_matrix(items)
+        return items.astype(np.int32, copy=False) @ self.weights.astype(np.int32)
@@ -0,0 +1,237 @@
+"""
+توليد الجداول الدراسية من سطر الأوامر بدون Streamlit (للتشغيل الليلي أو عبر cron).
+
+أمثلة:
+    # برنامج واحد
+    python timetable_cli.py --courses courses.xlsx --students plan.xlsx --output out/
+
+    # عدة برامج: كل مجلد فرعي يحتوي على courses.xlsx و students.xlsx
+    python timetable_cli.py --programs-dir programs/ --output out/ --workers 4 --format parquet
+
+لكل برنامج تُكتب الملفات التالية داخل مجلد الإخراج:
+    <program>/schedules.csv (أو .parquet): صف لكل طالب "Student ID", "Course 1", "Course 2", ...
+        (عدد أعمدة المقررات هو الحد الأعلى الممكن لطالب واحد، وتُترك الخانات الزائدة فارغة)
+    <program>/summary.csv: عدد الطلاب المحتمل لكل مقرر مع الساعات والمستوى.
+
+تُقسم خطة كل برنامج إلى دفعات من الطلاب تُحسب في عمليات متوازية، وتُكتب جداول كل دفعة فور
+وصولها بترتيب الطلاب في الخطة، فلا تُجمع جداول البرنامج كاملة في الذاكرة.
+"""
+import argparse
+import csv
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import pandas as pd
+
+from timetable_engine import CourseCatalog, clean_student_plan, schedule_optimal, schedule_with_catalog
+
+COURSES_FILENAME = "courses.xlsx"
+STUDENTS_FILENAME = "students.xlsx"
+CHUNK_SIZE = 10000  # الحد الأعلى لعدد الطلاب في كل دفعة حساب وكتابة
+
+
+def find_programs(programs_dir):
+    """يعيد قائمة (اسم البرنامج، ملف المقررات، ملف الخطة) لكل مجلد فرعي يحتوي على الملفين."""
+    programs = []
+    for name in sorted(os.listdir(programs_dir)):
+        folder = os.path.join(programs_dir, name)
+        courses_path = os.path.join(folder, COURSES_FILENAME)
+        students_path = os.path.join(folder, STUDENTS_FILENAME)
+        if os.path.isfile(courses_path) and os.path.isfile(students_path):
+            programs.append((name, courses_path, students_path))
+    return programs
+
+
+def schedule_columns(max_courses):
+    """أعمدة ملف الجداول بنفس شكل جدول التطبيق ("Student ID" ثم أعمدة المقررات)."""
+    return ["Student ID"] + [f"Course {i+1}" for i in range(max_courses)]
+
+
+def schedule_rows(student_schedules, max_courses):
+    """صف لكل طالب: رقمه ثم مقرراته، مع تعبئة الخانات الفارغة حتى max_courses."""
+    return [
+        [str(student_id)] + courses + [""] * (max_courses - len(courses))
+        for student_id, courses in student_schedules.items()
+    ]
+
+
+def student_chunks(students_df, chunk_size):
+    """يقسم خطة الطلاب إلى دفعات متتالية من الصفوف."""
+    for start in range(0, len(students_df), chunk_size):
+        yield students_df.iloc[start:start + chunk_size]
+
+
+def schedule_chunk(catalog, max_hours, max_courses, students_df):
+    """جداول دفعة من الطلاب بالطريقة السريعة (يُنفّذ داخل عملية مستقلة): (الصفوف، الملخص)."""
+    student_schedules, summary = schedule_with_catalog(catalog, students_df, max_hours)
+    return schedule_rows(student_schedules, max_courses), summary
+
+
+def iter_optimal_chunks(student_schedules, summary, max_courses, chunk_size):
+    """
+    وضع التحسين يوزع جميع طلاب البرنامج معاً، فتُقسم نتيجته المحسوبة إلى دفعات للكتابة فقط
+    (الملخص مع الدفعة الأولى).
+    """
+    items = list(student_schedules.items())
+    for start in range(0, len(items), chunk_size):
+        yield schedule_rows(dict(items[start:start + chunk_size]), max_courses), summary if start == 0 else {}
+
+
+class ScheduleWriter:
+    """
+    كتابة الجداول في ملف واحد على دفعات (CSV أو Parquet) بالأعمدة المعرّفة مسبقاً (جميعها نصوص).
+    يُنشأ الملف بالأعمدة فقط إن لم يكن فيه أي صف (مثل برنامج بدون طلاب).
+    """
+
+    def __init__(self, path, output_format, columns):
+        self.path = path
+        self.output_format = output_format
+        self.columns = columns
+        self.schema = None
+        self._parquet = None
+        self._file = None
+        self._csv = None
+
+    def _open(self):
+        if self.output_format == "parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            self.schema = pa.schema([(column, pa.string()) for column in self.columns])
+            self._parquet = pq.ParquetWriter(self.path, self.schema)
+        else:
+            self._file = open(self.path, mode='w', newline='', encoding='utf-8')
+            self._csv = csv.writer(self._file)
+            self._csv.writerow(self.columns)
+
+    def write(self, rows):
+        if not rows:
+            return
+        if self._parquet is None and self._file is None:
+            self._open()
+        if self.output_format == "parquet":
+            import pyarrow as pa
+
+            chunk = pd.DataFrame(rows, columns=self.columns)
+            self._parquet.write_table(pa.Table.from_pandas(chunk, schema=self.schema, preserve_index=False))
+            return
+        self._csv.writerows(rows)
+
+    def close(self):
+        if self._parquet is None and self._file is None:
+            self._open()
+        if self._parquet is not None:
+            self._parquet.close()
+        if self._file is not None:
+            self._file.close()
+
+
+def run_program(pool, workers, name, courses_path, students_path, output_dir, max_hours, output_format, optimal=None):
+    """
+    تشغيل الجدولة لبرنامج واحد عبر عمليات pool (عددها workers) وإعادة إحصاءات التشغيل. تُوزع دفعات
+    الطلاب على جميع العمليات حتى في البرامج الصغيرة، وتُكتب نتائجها بالترتيب فور وصولها.
+    optimal: None للطريقة السريعة، أو (عدد الشعب الافتراضي، مقاعد الشعبة الافتراضية، المهلة بالثواني)
+    لوضع التحسين مع مراعاة السعات.
+    """
+    start = time.perf_counter()
+    catalog = CourseCatalog(pd.read_excel(courses_path))
+    students_df = clean_student_plan(pd.read_excel(students_path))
+    max_courses = catalog.max_courses(max_hours)
+    chunk_size = max(1, min(CHUNK_SIZE, -(-len(students_df) // workers)))
+
+    if optimal is not None:
+        default_sections, default_seats, time_limit = optimal
+        capacities = catalog.capacities(default_sections, default_seats)
+        student_schedules, summary = pool.submit(
+            schedule_optimal, catalog, students_df, max_hours, capacities, time_limit=time_limit
+        ).result()
+        results = iter_optimal_chunks(student_schedules, summary, max_courses, chunk_size)
+    else:
+        results = pool.map(partial(schedule_chunk, catalog, max_hours, max_courses), student_chunks(students_df, chunk_size))
+
+    program_dir = os.path.join(output_dir, name)
+    os.makedirs(program_dir, exist_ok=True)
+    extension = "parquet" if output_format == "parquet" else "csv"
+    writer = ScheduleWriter(os.path.join(program_dir, f"schedules.{extension}"), output_format, schedule_columns(max_courses))
+    total = Counter()
+    try:
+        for rows, summary in results:
+            writer.write(rows)
+            total.update(summary)
+    finally:
+        writer.close()
+    catalog.summary_frame(total).to_csv(os.path.join(program_dir, "summary.csv"), index=False)
+
+    return {
+        "program": name,
+        "students": len(students_df),
+        "courses": len(catalog.codes),
+        "cyclic_courses": catalog.cyclic_courses,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="توليد الجداول الدراسية للطلاب دفعة واحدة بدون واجهة Streamlit.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--courses", help="ملف Excel الخاص بالمقررات (يُستخدم مع --students)")
+    source.add_argument("--programs-dir", help="مجلد يحتوي مجلداً فرعياً لكل برنامج فيه courses.xlsx و students.xlsx")
+    parser.add_argument("--students", help="ملف Excel الخاص بالخطة الدراسية للطلاب")
+    parser.add_argument("--output", required=True, help="مجلد الإخراج")
+    parser.add_argument("--max-hours", type=float, default=20, help="الحد الأقصى للساعات لكل طالب (افتراضياً 20)")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv", help="صيغة ملف الجداول")
+    parser.add_argument("--optimal", action="store_true", help="وضع التحسين مع مراعاة سعة الشعب (أبطأ)")
+    parser.add_argument("--sections", type=float, default=None, help="عدد الشعب الافتراضي للمقررات بدون قيمة في Sections")
+    parser.add_argument("--seats", type=float, default=None, help="عدد المقاعد الافتراضي للمقررات بدون قيمة في Capacity")
+    parser.add_argument("--time-limit", type=float, default=30, help="المهلة القصوى لوضع التحسين لكل برنامج بالثواني")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="عدد العمليات المتوازية")
+    args = parser.parse_args(argv)
+    if args.courses and not args.students:
+        parser.error("--students مطلوب عند استخدام --courses")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.programs_dir:
+        programs = find_programs(args.programs_dir)
+        if not programs:
+            print(f"لا توجد برامج تحتوي على {COURSES_FILENAME} و {STUDENTS_FILENAME} في {args.programs_dir}", file=sys.stderr)
+            return 1
+    else:
+        name = os.path.splitext(os.path.basename(args.students))[0]
+        programs = [(name, args.courses, args.students)]
+
+    os.makedirs(args.output, exist_ok=True)
+    optimal = (args.sections, args.seats, args.time_limit) if args.optimal else None
+    start = time.perf_counter()
+    total_students = 0
+    failed = 0
+
+    workers = max(1, args.workers)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for name, courses_path, students_path in programs:
+            try:
+                stats = run_program(pool, workers, name, courses_path, students_path, args.output, args.max_hours, args.format, optimal)
+            except Exception as e:
+                failed += 1
+                print(f"[{name}] حدث خطأ أثناء معالجة الملفات: {e}", file=sys.stderr)
+                continue
+            total_students += stats["students"]
+            rate = stats["students"] / stats["seconds"] if stats["seconds"] > 0 else float("inf")
+            print(f"[{name}] {stats['students']} طالب × {stats['courses']} مقرر في {stats['seconds']:.2f} ثانية ({rate:,.0f} صف/ثانية)")
+            if stats["cyclic_courses"]:
+                print(f"[{name}] حلقة في المتطلبات السابقة: {', '.join(stats['cyclic_courses'])}", file=sys.stderr)
+
+    elapsed = time.perf_counter() - start
+    rate = total_students / elapsed if elapsed > 0 else float("inf")
+    print(f"الإجمالي: {total_students} طالب من {len(programs) - failed} برنامج في {elapsed:.2f} ثانية ({rate:,.0f} صف/ثانية)")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,507 @@
+import hashlib
+import io
+import threading
+from collections import Counter, deque
+
+import numpy as np
+import pandas as pd
+
+# مجموعة الحالات التي تعتبر نجاح الطالب للمقرر
+PASSED_STATUSES = frozenset({'$', 'XM', 'A', '+A', 'B', '+B', 'C', '+C', '+D', 'D', 'P'})
+
+
+def has_no_prerequisite(prerequisite):
+    """يعيد True إذا كانت قيمة المتطلب السابق فارغة أو من القيم الدالة على عدم وجوده ('-' أو 'nan')."""
+    return pd.isna(prerequisite) or prerequisite == '' or prerequisite == '-' or str(prerequisite).lower() == 'nan'
+
+
+def content_hash(content):
+    """بصمة SHA-256 لمحتوى الملف المرفوع، تُستخدم مفتاحاً للتخزين المؤقت للكتالوج."""
+    return hashlib.sha256(content).hexdigest()
+
+
+class CourseCatalog:
+    """
+    كتالوج مقررات مُجهّز مسبقاً يُبنى مرة واحدة لكل ملف مقررات:
+    - codes: رموز المقررات بعد إزالة المسافات، مرتبة حسب "Level".
+    - hours: الساعات كمصفوفة رقمية (NaN للقيم غير الرقمية).
+    - levels: المستوى لكل مقرر بنفس الترتيب.
+    - prerequisites: المتطلب السابق لكل مقرر أو None إذا لم يوجد.
+    - prereq_index: موضع المتطلب داخل codes، أو -1 إذا لم يوجد أو لم يكن ضمن الكتالوج.
+    - topological_order: ترتيب طوبولوجي لمواضع المقررات في مخطط المتطلبات.
+    - cyclic_courses: المقررات الواقعة في حلقة متطلبات (لا يمكن تسجيلها ما لم يُجتز أحدها).
+    - sections / seats: عدد الشعب وعدد المقاعد في الشعبة لكل مقرر من العمودين الاختياريين
+      "Sections" و "Capacity" (NaN إذا لم يوجد العمود أو القيمة).
+    """
+
+    def __init__(self, courses_df):
+        courses_df = courses_df.copy()
+        # تنظيف بيانات المقررات: إزالة المسافات الزائدة من رموز المقررات والمتطلبات السابقة
+        courses_df['CourseCode'] = courses_df['CourseCode'].astype(str).str.strip()
+        courses_df['Pre-Requisite'] = courses_df['Pre-Requisite'].astype(str).str.strip()
+        # تحويل عمود الساعات إلى نوع رقمي
+        courses_df['Hours'] = pd.to_numeric(courses_df['Hours'], errors='coerce')
+
+        self.frame = courses_df.sort_values(by='Level')
+        self.codes = self.frame['CourseCode'].tolist()
+        self.hours = self.frame['Hours'].to_numpy(dtype=float)
+        self.levels = self.frame['Level'].tolist()
+        self.prerequisites = [
+            None if has_no_prerequisite(prerequisite) else prerequisite
+            for prerequisite in self.frame['Pre-Requisite'].tolist()
+        ]
+
+        first_position = {}
+        for k, code in enumerate(self.codes):
+            first_position.setdefault(code, k)
+        self.prereq_index = np.array(
+            [first_position.get(prerequisite, -1) if prerequisite is not None else -1
+             for prerequisite in self.prerequisites],
+            dtype=np.int64,
+        )
+        self.topological_order, self.cyclic_courses = self._sort_prerequisite_graph()
+
+        self.sections = self._optional_numeric('Sections')
+        self.seats = self._optional_numeric('Capacity')
+
+    def _optional_numeric(self, column):
+        if column not in self.frame.columns:
+            return np.full(len(self.codes), np.nan)
+        return pd.to_numeric(self.frame[column], errors='coerce').to_numpy(dtype=float)
+
+    def capacities(self, default_sections=None, default_seats=None):
+        """
+        السعة الكلية لكل مقرر (عدد الشعب × مقاعد الشعبة). تُستخدم القيم الافتراضية للمقررات
+        التي لا تحتوي على قيمة في الملف، وتكون السعة غير محدودة (inf) إذا بقيت أي قيمة مجهولة.
+        """
+        sections = self.sections.copy()
+        seats = self.seats.copy()
+        if default_sections is not None:
+            sections[np.isnan(sections)] = default_sections
+        if default_seats is not None:
+            seats[np.isnan(seats)] = default_seats
+        capacity = sections * seats
+        capacity[np.isnan(capacity)] = np.inf
+        return capacity
+
+    def max_courses(self, max_hours):
+        """
+        الحد الأعلى لعدد المقررات التي يمكن أن تُقترح لطالب واحد: أكبر عدد من أقل المقررات ساعات
+        لا يتجاوز مجموع ساعاته max_hours (لتثبيت أعمدة ملف الجداول قبل حسابها).
+        """
+        hours = np.sort(self.hours[~np.isnan(self.hours)])
+        fits = np.flatnonzero(np.cumsum(hours) <= max_hours)
+        return int(fits[-1]) + 1 if len(fits) else 0
+
+    @classmethod
+    def from_excel_bytes(cls, content):
+        """يبني الكتالوج من محتوى ملف Excel الخاص بالمقررات."""
+        return cls(pd.read_excel(io.BytesIO(content)))
+
+    def _sort_prerequisite_graph(self):
+        """ترتيب طوبولوجي (خوارزمية Kahn) لمخطط المتطلبات مع اكتشاف الحلقات."""
+        n = len(self.codes)
+        in_degree = np.zeros(n, dtype=np.int64)
+        dependents = [[] for _ in range(n)]
+        for k, parent in enumerate(self.prereq_index):
+            if parent >= 0:
+                dependents[parent].append(k)
+                in_degree[k] += 1
+
+        queue = deque(np.flatnonzero(in_degree == 0).tolist())
+        order = []
+        while queue:
+            k = queue.popleft()
+            order.append(k)
+            for child in dependents[k]:
+                in_degree[child] -= 1
+                if in_degree[child] == 0:
+                    queue.append(child)
+
+        # ما يتبقى بدرجة دخول موجبة يقع في حلقة أو يعتمد على مقرر داخل حلقة
+        remaining = np.flatnonzero(in_degree > 0)
+        cyclic = sorted({self.codes[k] for k in remaining})
+        return np.array(order, dtype=np.int64), cyclic
+
+    def summary_frame(self, summary):
+        """جدول ملخص المواد مرتباً حسب ترتيب الكتالوج مع الساعات والمستوى لكل مقرر."""
+        rows = []
+        seen = set()
+        for code, hours, level in zip(self.codes, self.hours, self.levels):
+            if code in summary and code not in seen:
+                seen.add(code)
+                rows.append((code, summary[code], hours, level))
+        return pd.DataFrame(rows, columns=['CourseCode', 'Number of Students', 'Hours', 'Level'])
+
+
+def generate_student_schedule(courses_df, students_df, max_hours, passed_statuses=PASSED_STATUSES):
+    """
+    تقوم الدالة بتوليد جدول دراسي لكل طالب على النحو التالي:
+    - ترتيب المقررات حسب العمود "Level".
+    - لكل طالب يتم المرور على المقررات التي لم يجتزها بعد (بافتراض أن الحالة "-" تعني عدم الاجتياز).
+    - يتم التحقق من أن الطالب قد اجتاز المتطلب السابق (أي أن حالة المقرر الخاص بالمتطلب ضمن passed_statuses) إن وُجد.
+    - تُضاف المقررات إلى جدول الطالب طالما لا يتجاوز مجموع الساعات قيمة max_hours.
+    - تُحدّث الدالة ملخصاً بعدد الطلاب المحتمل لكل مقرر.
+
+    هذه هي النسخة المرجعية (حلقة لكل طالب ولكل مقرر)، وتُستخدم للتحقق من مطابقة نتائج
+    generate_student_schedule_bulk.
+    """
+    summary = {}          # لتجميع عدد الطلاب لكل مقرر
+    student_schedules = {}  # لتخزين الجدول الدراسي لكل طالب
+
+    # ترتيب المقررات حسب "Level"
+    courses_df_sorted = courses_df.sort_values(by='Level')
+
+    # المرور على كل طالب في بيانات الخطة الدراسية
+    for _, student in students_df.iterrows():
+        student_id = student['ID']
+        total_hours = 0
+        schedule = []  # قائمة المقررات المختارة للطالب
+
+        # المرور على كل مقرر من ملف المقررات
+        for _, course_row in courses_df_sorted.iterrows():
+            course_code = course_row['CourseCode']
+            course_hours = course_row['Hours']
+            prerequisite = course_row['Pre-Requisite']
+
+            # التأكد من وجود عمود المقرر في بيانات الطلاب (مع مراعاة التنظيف)
+            if course_code not in students_df.columns:
+                continue
+
+            # استرجاع حالة الطالب للمقرر وتنظيف القيمة إن كانت نصية
+            status = student[course_code]
+            if isinstance(status, str):
+                status = status.strip()
+
+            # إذا كان الطالب قد اجتاز المقرر (وفقاً للحالات المحددة) فلا داعي لإضافته مرة أخرى
+            if status in passed_statuses:
+                continue
+
+            # التحقق من المتطلب السابق، إذا كان موجوداً:
+            if has_no_prerequisite(prerequisite):
+                prereq_satisfied = True
+            else:
+                # التأكد من وجود عمود المتطلب في بيانات الطلاب
+                if prerequisite not in students_df.columns:
+                    prereq_satisfied = False
+                else:
+                    prereq_status = student[prerequisite]
+                    if isinstance(prereq_status, str):
+                        prereq_status = prereq_status.strip()
+                    # يعتبر المتطلب مستوفى إذا كانت حالته ضمن passed_statuses
+                    prereq_satisfied = prereq_status in passed_statuses
+
+            if not prereq_satisfied:
+                continue
+
+            # التحقق من عدم تجاوز مجموع الساعات الحد الأقصى
+            if total_hours + course_hours <= max_hours:
+                schedule.append(course_code)
+                total_hours += course_hours
+                summary[course_code] = summary.get(course_code, 0) + 1
+
+        student_schedules[student_id] = schedule
+
+    return student_schedules, summary
+
+
+def strip_strings(column):
+    """
+    إزالة المسافات الزائدة من القيم النصية في عمود كامل بعمليات نصية مجمّعة،
+    مع المحافظة على القيم غير النصية كما هي.
+    """
+    if not (column.dtype == object or pd.api.types.is_string_dtype(column.dtype)):
+        return column
+    try:
+        stripped = column.str.strip()
+    except AttributeError:
+        # عمود من نوع object لا يحتوي على أي قيمة نصية
+        return column
+    # القيم غير النصية تصبح NaN بعد .str، فنعيدها من العمود الأصلي
+    return stripped.where(stripped.notna(), column)
+
+
+def clean_student_plan(students_df):
+    """
+    تنظيف بيانات الخطة الدراسية للطلاب:
+    - إزالة المسافات الزائدة من أسماء الأعمدة.
+    - إزالة المسافات الزائدة من القيم النصية عموداً بعمود، مع المحافظة على القيم غير النصية كما هي.
+    """
+    students_df = students_df.copy()
+    students_df.columns = [col.strip() if isinstance(col, str) else col for col in students_df.columns]
+    for position in range(students_df.shape[1]):
+        students_df.iloc[:, position] = strip_strings(students_df.iloc[:, position])
+    return students_df
+
+
+# جدول رموز حالة الطالب في المقرر (int8)
+STATUS_NOT_TAKEN = 0    # لم يُجتز بعد ("-" أو فارغ أو راسب أو أي حالة أخرى)
+STATUS_PASSED = 1       # اجتاز المقرر
+STATUS_IN_PROGRESS = 2  # مسجل حالياً ويفترض نجاحه (يُعامل كمجتاز عند التحقق من المتطلبات)
+
+# الحالات من passed_statuses التي تعني أن الطالب مسجل حالياً في المقرر
+IN_PROGRESS_STATUSES = frozenset({'$'})
+
+
+def status_code(value, passed_statuses=PASSED_STATUSES):
+    """رمز الحالة (STATUS_*) لقيمة خلية واحدة من خلايا الخطة الدراسية."""
+    if isinstance(value, str):
+        value = value.strip()
+        if value in passed_statuses:
+            return STATUS_IN_PROGRESS if value in IN_PROGRESS_STATUSES else STATUS_PASSED
+    return STATUS_NOT_TAKEN
+
+
+def encode_statuses(students_df, codes, passed_statuses=PASSED_STATUSES):
+    """
+    تحويل حالات الطلاب في المقررات codes إلى مصفوفة int8 (عدد الطلاب × عدد الرموز).
+    يُرمَّز كل عمود عبر القيم الفريدة فيه فقط (factorize)، فلا تُستدعى دالة بايثون لكل خلية.
+    الرموز غير الموجودة كأعمدة في بيانات الطلاب تُعطى STATUS_NOT_TAKEN.
+    """
+    statuses = np.full((len(students_df), len(codes)), STATUS_NOT_TAKEN, dtype=np.int8)
+    for j, code in enumerate(codes):
+        if code not in students_df.columns:
+            continue
+        column = students_df[code]
+        if isinstance(column, pd.DataFrame):
+            # عمود مكرر بنفس الاسم: نأخذ أول ظهور
+            column = column.iloc[:, 0]
+        indices, uniques = pd.factorize(column)
+        lookup = np.array([status_code(value, passed_statuses) for value in uniques], dtype=np.int8)
+        present = indices >= 0
+        statuses[present, j] = lookup[indices[present]]
+    return statuses
+
+
+def passed_matrix(students_df, codes, passed_statuses=PASSED_STATUSES):
+    """
+    تبني مصفوفة منطقية (عدد الطلاب × عدد الرموز) تكون قيمتها True إذا كانت حالة الطالب
+    في المقرر ضمن passed_statuses (مجتاز أو مسجل حالياً).
+    """
+    return encode_statuses(students_df, codes, passed_statuses) != STATUS_NOT_TAKEN
+
+
+def greedy_take(eligible, hours, max_hours, capacities=None):
+    """
+    تطبق قاعدة الاختيار الجشع على جميع الطلاب دفعة واحدة: تمر على المقررات بالترتيب
+    (أعمدة eligible) وتضيف المقرر لكل طالب مؤهل طالما لا يتجاوز مجموع ساعاته max_hours.
+    إذا مُررت capacities يُكتفى بأول الطلاب (حسب ترتيبهم) حتى امتلاء سعة المقرر.
+    تعيد مصفوفة منطقية بنفس أبعاد eligible تمثل المقررات المختارة.
+    """
+    n_students, n_courses = eligible.shape
+    take = np.zeros_like(eligible)
+    total_hours = np.zeros(n_students, dtype=float)
+    for j in range(n_courses):
+        course_hours = hours[j]
+        # الساعات غير الرقمية (NaN) لا تحقق شرط الحد الأقصى كما في النسخة المرجعية
+        if np.isnan(course_hours):
+            continue
+        chosen = eligible[:, j] & (total_hours + course_hours <= max_hours)
+        if capacities is not None and np.isfinite(capacities[j]):
+            chosen[np.flatnonzero(chosen)[max(int(capacities[j]), 0):]] = False
+        take[:, j] = chosen
+        total_hours[chosen] += course_hours
+    return take
+
+
+def collect_schedules(student_ids, codes, take):
+    """
+    تحول مصفوفة الاختيار إلى student_schedules و summary بنفس ترتيب وشكل النسخة المرجعية:
+    ترتيب الطلاب حسب أول ظهور للرقم، وترتيب مفاتيح الملخص حسب أول طالب أُسند إليه المقرر.
+    """
+    student_schedules = {}
+    codes = np.asarray(codes, dtype=object)
+    for row, student_id in enumerate(student_ids):
+        student_schedules[student_id] = codes[take[row]].tolist()
+
+    counts = take.sum(axis=0)
+    scheduled = np.flatnonzero(counts)
+    if len(scheduled) == 0:
+        # لا طلاب أو لا مقررات مختارة (argmax لا يقبل مصفوفة فارغة)
+        return student_schedules, {}
+    # أول (طالب، موضع المقرر) ظهر فيه المقرر يحدد ترتيب إدراجه في الملخص
+    first_student = take[:, scheduled].argmax(axis=0)
+    order = np.lexsort((scheduled, first_student))
+    summary = {}
+    for j in scheduled[order]:
+        code = codes[j]
+        summary[code] = summary.get(code, 0) + int(counts[j])
+    return student_schedules, summary
+
+
+def eligibility_matrix(catalog, students_df, passed_statuses=PASSED_STATUSES):
+    """
+    مصفوفة أهلية منطقية (عدد الطلاب × عدد مقررات الكتالوج):
+    - تُحوَّل حالات الطلاب إلى مصفوفة "اجتاز" منطقية مرة واحدة.
+    - يُحوَّل كل متطلب سابق إلى رقم عمود في تلك المصفوفة مرة واحدة.
+    - يكون الطالب مؤهلاً للمقرر إذا لم يجتزه واجتاز متطلبه السابق (إن وُجد).
+    """
+    codes = catalog.codes
+
+    # أعمدة المصفوفة: رموز المقررات ثم المتطلبات السابقة التي ليست ضمن رموز المقررات
+    column_codes = list(dict.fromkeys(codes))
+    column_index = {code: j for j, code in enumerate(column_codes)}
+    prereq_columns = np.full(len(codes), -1, dtype=np.int64)   # -1: لا يوجد متطلب
+    for k, prerequisite in enumerate(catalog.prerequisites):
+        if prerequisite is None:
+            continue
+        if prerequisite not in column_index:
+            column_index[prerequisite] = len(column_codes)
+            column_codes.append(prerequisite)
+        prereq_columns[k] = column_index[prerequisite]
+
+    passed = passed_matrix(students_df, column_codes, passed_statuses)
+    course_columns = np.array([column_index[code] for code in codes], dtype=np.int64)
+    in_plan = np.array([code in students_df.columns for code in codes], dtype=bool)
+    prereq_in_plan = np.array(
+        [p < 0 or column_codes[p] in students_df.columns for p in prereq_columns], dtype=bool
+    )
+
+    # المتطلب مستوفى إذا لم يوجد، أو إذا اجتازه الطالب
+    prereq_ok = np.ones((len(students_df), len(codes)), dtype=bool)
+    has_prereq = prereq_columns >= 0
+    prereq_ok[:, has_prereq] = passed[:, prereq_columns[has_prereq]]
+
+    return (~passed[:, course_columns]) & prereq_ok & (in_plan & prereq_in_plan)
+
+
+def schedule_with_catalog(catalog, students_df, max_hours, passed_statuses=PASSED_STATUSES):
+    """
+    توليد الجداول لجميع الطلاب اعتماداً على كتالوج مُجهّز (CourseCatalog): تُحسب أهلية جميع
+    الطلاب لجميع المقررات بعمليات مصفوفات، ثم يُطبق الحد الأقصى للساعات على جميع الطلاب معاً
+    مقرراً بعد مقرر (حسب "Level").
+    """
+    eligible = eligibility_matrix(catalog, students_df, passed_statuses)
+    take = greedy_take(eligible, catalog.hours, max_hours)
+    return collect_schedules(students_df['ID'].tolist(), catalog.codes, take)
+
+
+class IncrementalScheduler:
+    """
+    يحتفظ بنتيجة آخر تشغيل للطريقة السريعة (كتالوج وحد أقصى ثابتين) ويعيد حساب جداول
+    الطلاب الذين تغيرت صفوفهم فقط عند رفع نسخة جديدة من الخطة الدراسية:
+    - يُقارن كل صف ببصمته السابقة (hash للصف كاملاً) حسب رقم الطالب.
+    - تُطرح مقررات الطلاب المتغيرين أو المحذوفين من الملخص وتُضاف مقرراتهم الجديدة.
+    يُعاد الحساب كاملاً إذا تغيرت أعمدة الملف أو وُجدت أرقام طلاب مكررة.
+    """
+
+    def __init__(self, catalog, max_hours, passed_statuses=PASSED_STATUSES):
+        self.catalog = catalog
+        self.max_hours = max_hours
+        self.passed_statuses = passed_statuses
+        self.columns = None
+        self.row_hashes = {}
+        self.schedules = {}
+        self.summary = Counter()
+        self._lock = threading.Lock()
+
+    def update(self, students_df):
+        """يعيد (student_schedules, summary, عدد الطلاب الذين أعيد حساب جداولهم)."""
+        with self._lock:
+            columns = tuple(students_df.columns)
+            student_ids = students_df['ID'].tolist()
+            hashes = pd.util.hash_pandas_object(students_df, index=False).to_numpy()
+
+            if columns != self.columns or len(set(student_ids)) != len(student_ids):
+                student_schedules, summary = schedule_with_catalog(
+                    self.catalog, students_df, self.max_hours, self.passed_statuses
+                )
+                unique_ids = len(set(student_ids)) == len(student_ids)
+                self.columns = columns if unique_ids else None
+                self.row_hashes = dict(zip(student_ids, hashes)) if unique_ids else {}
+                self.schedules = dict(student_schedules)
+                self.summary = Counter(summary)
+                return student_schedules, summary, len(student_ids)
+
+            changed_rows = [
+                row for row, (student_id, row_hash) in enumerate(zip(student_ids, hashes))
+                if self.row_hashes.get(student_id) != row_hash
+            ]
+            removed_ids = set(self.schedules) - set(student_ids)
+            for student_id in removed_ids | {student_ids[row] for row in changed_rows}:
+                self.summary.subtract(self.schedules.get(student_id, []))
+
+            new_schedules = {}
+            if changed_rows:
+                new_schedules, _ = schedule_with_catalog(
+                    self.catalog, students_df.iloc[changed_rows], self.max_hours, self.passed_statuses
+                )
+                for schedule in new_schedules.values():
+                    self.summary.update(schedule)
+            self.summary = Counter({code: count for code, count in self.summary.items() if count > 0})
+
+            self.schedules = {
+                student_id: new_schedules[student_id] if student_id in new_schedules else self.schedules[student_id]
+                for student_id in student_ids
+            }
+            self.row_hashes = dict(zip(student_ids, hashes))
+            return dict(self.schedules), dict(self.summary), len(changed_rows)
+
+
+def schedule_optimal(catalog, students_df, max_hours, capacities, passed_statuses=PASSED_STATUSES, time_limit=30, mip_gap=1e-2):
+    """
+    وضع الجدولة الأمثل مع مراعاة سعة الشعب (برمجة خطية صحيحة عبر HiGHS في scipy):
+    - متغير ثنائي لكل زوج (طالب، مقرر مؤهل له).
+    - الهدف: تعظيم مجموع الساعات المسجلة لجميع الطلاب.
+    - القيود: مجموع ساعات كل طالب لا يتجاوز max_hours، وعدد الطلاب في كل مقرر لا يتجاوز سعته.
+
+    يتوقف الحل عند الوصول إلى فجوة نسبية mip_gap (1% افتراضياً) من الحد الأعلى لمجموع الساعات،
+    فإثبات الأمثلية التامة لدفعة كاملة قد يستغرق دقائق بينما يتحسن الحل بعدها بساعات قليلة فقط.
+
+    تُحسب أولاً نتيجة الطريقة الجشعة مع احترام السعات، وتُعاد إذا لم يجد الحل الأمثل حلاً
+    أفضل منها خلال time_limit ثانية (لا تدعم واجهة scipy تمرير حل ابتدائي للحل).
+    """
+    from scipy.optimize import Bounds, LinearConstraint, milp
+    from scipy.sparse import csr_matrix, vstack
+
+    eligible = eligibility_matrix(catalog, students_df, passed_statuses)
+    hours = catalog.hours
+    capacities = np.asarray(capacities, dtype=float)
+    warm_take = greedy_take(eligible, hours, max_hours, capacities)
+    student_ids = students_df['ID'].tolist()
+
+    usable = ~np.isnan(hours) & (hours <= max_hours)
+    students, courses = np.nonzero(eligible & usable)
+    n_vars = len(students)
+    if n_vars == 0:
+        return collect_schedules(student_ids, catalog.codes, warm_take)
+
+    n_students = eligible.shape[0]
+    course_hours = hours[courses]
+    objective = -course_hours
+
+    variables = np.arange(n_vars)
+    student_rows = csr_matrix((course_hours, (students, variables)), shape=(n_students, n_vars))
+    limited = np.isfinite(capacities)
+    course_position = np.cumsum(limited) - 1
+    keep = limited[courses]
+    course_rows = csr_matrix(
+        (np.ones(keep.sum()), (course_position[courses[keep]], variables[keep])),
+        shape=(int(limited.sum()), n_vars),
+    )
+    constraints = LinearConstraint(
+        vstack([student_rows, course_rows]).tocsr(),
+        -np.inf,
+        np.concatenate([np.full(n_students, float(max_hours)), capacities[limited]]),
+    )
+    result = milp(
+        objective,
+        constraints=constraints,
+        integrality=np.ones(n_vars),
+        bounds=Bounds(0, 1),
+        options={"time_limit": time_limit, "mip_rel_gap": mip_gap},
+    )
+
+    take = warm_take
+    if result.x is not None:
+        chosen = result.x > 0.5
+        solver_take = np.zeros_like(eligible)
+        solver_take[students[chosen], courses[chosen]] = True
+        if hours[solver_take.nonzero()[1]].sum() >= hours[warm_take.nonzero()[1]].sum():
+            take = solver_take
+    return collect_schedules(student_ids, catalog.codes, take)
+
+
+def generate_student_schedule_bulk(courses_df, students_df, max_hours, passed_statuses=PASSED_STATUSES):
+    """نسخة مجمّعة من generate_student_schedule تعيد نفس student_schedules و summary."""
+    return schedule_with_catalog(CourseCatalog(courses_df), students_df, max_hours, passed_statuses)
@@ -0,0 +1,123 @@
+import glob
+import hashlib
+import os
+import sys
+import tempfile
+
+import pandas as pd
+
+RIASEC_LETTERS = "RIASEC"
+FIELD_COLUMNS = [f"المجال التعليمي {i}" for i in range(1, 4)]
+# فاصل التخصصات المقترحة عند دمجها في نص واحد (في HandV3 وفي نتائج holland_batch)
+MAJORS_SEPARATOR = ", "
+
+# مجلد النسخة العمودية (Feather) من ملف المهن، بجانب ملف Excel
+CACHE_DIR = ".usoc_cache"
+
+
+def file_checksum(path):
+    """بصمة SHA-256 لمحتوى الملف."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_path(excel_path, checksum):
+    folder = os.path.join(os.path.dirname(os.path.abspath(excel_path)), CACHE_DIR)
+    name = os.path.splitext(os.path.basename(excel_path))[0]
+    return os.path.join(folder, f"{name}-{checksum[:16]}.feather")
+
+
+def load_usoc_table(excel_path):
+    """
+    تحميل جدول المهن من نسخة Feather عمودية إن كانت مطابقة لبصمة ملف Excel الحالي،
+    وإلا قراءة ملف Excel (بطيء عبر openpyxl) وكتابة نسخة Feather جديدة وحذف النسخ القديمة.
+    إذا تعذرت كتابة النسخة العمودية يُعاد الجدول المقروء من Excel كما هو.
+    """
+    checksum = file_checksum(excel_path)
+    cached = cache_path(excel_path, checksum)
+    if os.path.exists(cached):
+        try:
+            return pd.read_feather(cached)
+        except Exception:
+            pass  # نسخة تالفة: نعيد بناءها من Excel
+
+    df = pd.read_excel(excel_path)
+    folder = os.path.dirname(cached)
+    try:
+        os.makedirs(folder, exist_ok=True)
+        # الكتابة في ملف مؤقت ثم استبداله حتى لا تقرأ عملية أخرى ملفاً ناقصاً
+        fd, temp_path = tempfile.mkstemp(dir=folder, suffix=".tmp")
+        os.close(fd)
+        try:
+            df.reset_index(drop=True).to_feather(temp_path)
+            os.replace(temp_path, cached)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        for stale in glob.glob(cache_path(excel_path, "*")):
+            if stale != cached:
+                os.remove(stale)
+    except Exception as e:
+        print(f"تعذر إنشاء النسخة العمودية من {excel_path}: {e}", file=sys.stderr)
+    return df
+
+
+def sort_code(code):
+    """ترتيب حروف كود هولاند بحيث يتطابق 'SE' و 'ES'."""
+    return "".join(sorted(str(code)))
+
+
+class USOCIndex:
+    """
+    فهرس مُجهّز مسبقاً لجدول المهن (USOC) يُبنى مرة واحدة لكل عملية:
+    - frame: الجدول مرتباً حسب الكود بعد ترتيب حروفه (ترتيب مستقر يحافظ على ترتيب الصفوف الأصلي
+      وأرقامها داخل كل كود)، بحيث تكون مهن كل كود في نطاق صفوف متصل.
+    - ranges: الكود المرتب -> (بداية، نهاية) نطاق الصفوف في frame.
+    - fields: الكود المرتب -> التخصصات المقترحة (من أعمدة "المجال التعليمي 1..3") بدون تكرار ومرتبة.
+    - letter_rows: كل حرف من RIASEC -> مواضع الصفوف في frame التي يحتوي كودها على هذا الحرف.
+    """
+
+    def __init__(self, df):
+        keys = df['CODE'].map(sort_code)
+        order = keys.argsort(kind="stable")
+        self.frame = df.iloc[order]
+        sorted_keys = keys.iloc[order].tolist()
+
+        self.ranges = {}
+        for position, key in enumerate(sorted_keys):
+            start, _ = self.ranges.get(key, (position, position))
+            self.ranges[key] = (start, position + 1)
+
+        field_columns = [col for col in FIELD_COLUMNS if col in self.frame.columns]
+        self.fields = {}
+        for key, (start, stop) in self.ranges.items():
+            values = self.frame.iloc[start:stop][field_columns].stack()
+            self.fields[key] = sorted(set(values[values.notna()]))
+
+        self.letter_rows = {
+            letter: [position for position, key in enumerate(sorted_keys) if letter in key]
+            for letter in RIASEC_LETTERS
+        }
+
+    def lookup(self, code):
+        """المهن المرتبطة بالكود (بغض النظر عن ترتيب حروفه)، أو جدول فارغ إذا لم توجد."""
+        start, stop = self.ranges.get(sort_code(code), (0, 0))
+        return self.frame.iloc[start:stop]
+
+    def suggested_fields(self, code):
+        """التخصصات المقترحة للكود بدون تكرار ومرتبة."""
+        return self.fields.get(sort_code(code), [])
+
+    def rows_with_letter(self, letter):
+        """جميع المهن التي يحتوي كودها على الحرف المحدد من RIASEC."""
+        return self.frame.iloc[self.letter_rows.get(letter, [])]
+
+
+if __name__ == "__main__":
+    # خطوة بناء: تجهيز النسخة العمودية مسبقاً (مثلاً بعد النشر) حتى لا تتحملها أول جلسة
+    for path in sys.argv[1:] or ["USOC.xlsx"]:
+        table = load_usoc_table(path)
+        print(f"{path}: {len(table)} مهنة -> {cache_path(path, file_checksum(path))}")